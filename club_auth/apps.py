@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ClubAuthConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'club_auth'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,51 @@
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from .authentication import StatelessJWTAuthentication, ais_revoked
+
+User = get_user_model()
+
+_jwt = StatelessJWTAuthentication()
+
+
+async def authenticated_user_id(request):
+    """
+    Async counterpart of DRF's JWT-then-session authentication for plain Django views.
+
+    Returns the id of the authenticated user, or None.
+    """
+    header = _jwt.get_header(request)
+    if header is None:
+        user = await request.auser()
+        return user.pk if user.is_authenticated else None
+
+    raw_token = _jwt.get_raw_token(header)
+    if raw_token is None:
+        return None
+    try:
+        # Signature and expiry checks are CPU-only
+        token = _jwt.get_validated_token(raw_token)
+    except (InvalidToken, TokenError):
+        return None
+    if await ais_revoked(token):
+        return None
+    user_id = int(token[api_settings.USER_ID_CLAIM])
+    if 'is_active' in token:
+        return user_id if token['is_active'] else None
+    # Issued before tokens carried the profile claims
+    return user_id if await User.objects.filter(pk=user_id, is_active=True).aexists() else None
+
+
+async def is_authenticated(request):
+    return await authenticated_user_id(request) is not None
+
+
+# Check if the user is authenticated or not (ASGI-native)
+@require_GET
+async def check(request):
+    if await is_authenticated(request):
+        return JsonResponse({"message": "Authenticated user"})
+    return JsonResponse({"message": "Unauthenticated user"}, status=401)
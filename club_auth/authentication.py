@@ -0,0 +1,237 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .models import LoggedOutToken
+from .revocation import logouts
+
+User = get_user_model()
+
+# Profile fields copied into every token so most requests never load the user row
+PROFILE_CLAIMS = ('studentId', 'name', 'role', 'is_active')
+# The jti of the refresh token an access token was minted from; logging it out revokes the access token
+REFRESH_JTI_CLAIM = 'rjti'
+
+
+class ClubRefreshToken(RefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in PROFILE_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+    # check_blacklist() stays the indexed BlacklistedToken query: the in-process
+    # filter lags other workers by SYNC_INTERVAL, which would let a rotated-out
+    # token be refreshed twice there.
+
+    def blacklist(self):
+        """Return (BlacklistedToken, created); created is False if it was already blacklisted."""
+        jti = self[api_settings.JTI_CLAIM]
+        # for_user() and rotation record every token as outstanding, so the
+        # parent's user lookup is only needed for tokens issued elsewhere
+        token = OutstandingToken.objects.filter(jti=jti).first()
+        if token is None:
+            blacklisted = super().blacklist()
+        else:
+            blacklisted = BlacklistedToken.objects.get_or_create(token=token)
+        return blacklisted
+
+    def log_out(self):
+        """Blacklist this token and revoke the access tokens minted from it."""
+        blacklisted, _ = self.blacklist()
+        # One INSERT; a token logged out twice is rejected by the blacklist check first anyway
+        LoggedOutToken.objects.bulk_create([LoggedOutToken(token_id=blacklisted.token_id)], ignore_conflicts=True)
+        logouts.add(self[api_settings.JTI_CLAIM])
+
+    def outstand_rotated(self, user):
+        # A freshly set jti cannot be outstanding yet: INSERT without outstand()'s lookups
+        return OutstandingToken.objects.create(
+            user=user, jti=self[api_settings.JTI_CLAIM], token=str(self),
+            created_at=self.current_time, expires_at=datetime_from_epoch(self['exp']),
+        )
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        access[REFRESH_JTI_CLAIM] = self[api_settings.JTI_CLAIM]
+        return access
+
+
+class ClubTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = ClubRefreshToken
+
+
+class ClubTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = ClubRefreshToken
+
+    def validate(self, attrs):
+        # TokenRefreshSerializer.validate, loading the user once: the parent
+        # fetches it again to blacklist and to outstand the rotated token.
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]}).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        data = {}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                # Another request may have rotated it since check_blacklist(); the
+                # unique token row decides which one gets to continue the chain
+                _, created = refresh.blacklist()
+                if not created:
+                    raise TokenError("Token is blacklisted")
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+        # Re-read the profile claims so edits reach the next tokens; the
+        # access token is minted from the rotated refresh token, as the one it
+        # came from has just been blacklisted.
+        for claim in PROFILE_CLAIMS:
+            refresh[claim] = getattr(user, claim)
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            refresh.outstand_rotated(user)
+            data['refresh'] = str(refresh)
+        data['access'] = str(refresh.access_token)
+        return data
+
+
+class UserCache:
+    """Small per-process TTL + LRU cache of full user rows, keyed by id."""
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # id -> (expires_at, user)
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+
+        user = User.objects.filter(pk=user_id).first()
+        if user is not None:
+            with self._lock:
+                self._entries[user_id] = (now + self.ttl, user)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return user
+
+    def discard(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache(settings.AUTH_USER_CACHE['TTL'], settings.AUTH_USER_CACHE['MAX_ENTRIES'])
+
+
+class ClaimsUser(TokenUser):
+    """
+    Request user built from the access token claims.
+
+    id, studentId, name, role and is_active come straight from the token.
+    Anything else (and the claims of tokens issued before they were added)
+    is read from the full CustomUser, fetched through user_cache.
+    """
+
+    @cached_property
+    def id(self):
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def is_active(self):
+        return self._claim('is_active')
+
+    @cached_property
+    def studentId(self):
+        return self._claim('studentId')
+
+    @cached_property
+    def name(self):
+        return self._claim('name')
+
+    @cached_property
+    def role(self):
+        return self._claim('role')
+
+    @cached_property
+    def full_user(self):
+        user = user_cache.get(self.id)
+        if user is None:
+            raise AuthenticationFailed("User not found", code='user_not_found')
+        return user
+
+    def _claim(self, claim):
+        if claim in self.token:
+            return self.token[claim]
+        return getattr(self.full_user, claim)
+
+    def __getattr__(self, attr):
+        # Only reached for attributes ClaimsUser does not define itself
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self.full_user, attr)
+
+
+def full_user(user):
+    """The CustomUser behind request.user, whichever authentication class set it."""
+    return user.full_user if isinstance(user, ClaimsUser) else user
+
+
+def is_revoked(token):
+    """
+    Whether the refresh token this access token came from has been logged out.
+
+    Rotation blacklists refresh tokens too, but the access tokens minted
+    from them stay valid until they expire.
+    """
+    jti = token.get(REFRESH_JTI_CLAIM)
+    return jti is not None and logouts.is_revoked(jti)
+
+
+async def ais_revoked(token):
+    jti = token.get(REFRESH_JTI_CLAIM)
+    return jti is not None and await logouts.ais_revoked(jti)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication without the per-request CustomUser lookup.
+
+    Profile changes and deactivation show up in the claims once the access
+    token is next refreshed (ACCESS_TOKEN_LIFETIME at most).
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken("Token contained no recognizable user identification")
+        if is_revoked(validated_token):
+            raise AuthenticationFailed("Token has been revoked", code='token_revoked')
+
+        user = ClaimsUser(validated_token)
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive", code='user_inactive')
+        return user
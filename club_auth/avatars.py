@@ -0,0 +1,117 @@
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.dispatch import Signal
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+THUMBNAILS = settings.AVATAR_THUMBNAILS
+FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+# Sent with user_ids once those members point at new thumbnails. process_avatar
+# updates avatar_hash with .update(), so post_save does not fire for it.
+avatar_changed = Signal()
+THUMBNAIL_DIR = 'avatars/thumbs'
+
+
+def storage():
+    return User._meta.get_field('avatar').storage
+
+
+def thumbnail_name(digest, size, extension):
+    # Named by content: identical uploads share files, and a name never changes
+    # meaning, so it can be cached forever
+    return f'{THUMBNAIL_DIR}/{digest[:2]}/{digest}-{size}.{extension}'
+
+
+def thumbnail_urls(digest):
+    """{size: {extension: url}} for an avatar_hash."""
+    return {
+        size: {extension: storage().url(thumbnail_name(digest, size, extension)) for extension in FORMATS}
+        for size in THUMBNAILS['SIZES']
+    }
+
+
+@lru_cache(maxsize=4096)
+def embed_url(digest):
+    return storage().url(thumbnail_name(digest, THUMBNAILS['EMBED_SIZE'], THUMBNAILS['EMBED_FORMAT']))
+
+
+def render_thumbnail(image, size, image_format):
+    thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+    if image_format == 'JPEG' and thumbnail.mode != 'RGB':
+        thumbnail = thumbnail.convert('RGB')
+    output = BytesIO()
+    thumbnail.save(output, image_format, quality=THUMBNAILS['QUALITY'], optimize=image_format == 'JPEG')
+    return output.getvalue()
+
+
+def generate_thumbnails(name):
+    """
+    Write the missing thumbnails of a stored avatar and return its content hash.
+
+    Thumbnails already present for the same content are reused, so a member
+    uploading an image someone else already has costs one read and a hash.
+    """
+    with storage().open(name, 'rb') as source:
+        data = source.read()
+    digest = hashlib.sha256(data).hexdigest()[:32]
+
+    missing = [
+        (size, extension)
+        for size in THUMBNAILS['SIZES'] for extension in FORMATS
+        if not storage().exists(thumbnail_name(digest, size, extension))
+    ]
+    if missing:
+        image = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+        for size, extension in missing:
+            content = render_thumbnail(image, size, FORMATS[extension])
+            storage().save(thumbnail_name(digest, size, extension), ContentFile(content))
+    return digest
+
+
+def process_avatar(name):
+    """Generate thumbnails for an avatar file and point every member using it at them."""
+    try:
+        digest = generate_thumbnails(name)
+        user_ids = list(User.objects.filter(avatar=name).exclude(avatar_hash=digest).values_list('id', flat=True))
+        updated = User.objects.filter(pk__in=user_ids).update(avatar_hash=digest)
+        if updated:
+            avatar_changed.send(sender=User, user_ids=user_ids)
+        return updated
+    except FileNotFoundError:
+        logger.warning("Avatar file %s is missing", name)
+    except Exception:
+        logger.exception("Could not generate thumbnails for %s", name)
+    finally:
+        close_old_connections()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Threads are enough: Pillow releases the GIL while resizing and encoding
+            _pool = ThreadPoolExecutor(THUMBNAILS['WORKERS'], thread_name_prefix='avatars')
+        return _pool
+
+
+def schedule_avatar(name):
+    """Process an uploaded avatar in the worker pool once the upload is committed."""
+    transaction.on_commit(lambda: get_pool().submit(process_avatar, name))
@@ -0,0 +1,52 @@
+import functools
+import threading
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, ScryptPasswordHasher
+from django.http import JsonResponse
+
+HASHING = settings.PASSWORD_HASHING
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    """
+    scrypt with costs from settings.PASSWORD_HASHING (see bench_hashers).
+
+    Stored hashes keep their own parameters, so changing the costs only
+    makes must_update() true and the hash is upgraded on the next login.
+    """
+
+    work_factor = HASHING['SCRYPT_N']
+    block_size = HASHING['SCRYPT_R']
+    parallelism = HASHING['SCRYPT_P']
+    # hashlib's default limit (32 MiB) is too small for larger N or r
+    maxmem = 256 * work_factor * block_size
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    time_cost = HASHING['ARGON2_TIME_COST']
+    memory_cost = HASHING['ARGON2_MEMORY_COST']
+    parallelism = HASHING['ARGON2_PARALLELISM']
+
+
+_slots = threading.BoundedSemaphore(HASHING['MAX_CONCURRENCY'])
+
+
+def hashing_slot(view):
+    """
+    Bound how many requests in this process hash passwords at once.
+
+    A login storm then queues here (for up to QUEUE_TIMEOUT seconds, then
+    503) instead of taking every core away from the blog endpoints.
+    """
+    @functools.wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if not _slots.acquire(timeout=HASHING['QUEUE_TIMEOUT']):
+            response = JsonResponse({"error": "Too many login attempts in progress, try again shortly"}, status=503)
+            response['Retry-After'] = '1'
+            return response
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _slots.release()
+    return wrapped
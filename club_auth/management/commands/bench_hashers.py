@@ -0,0 +1,74 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, get_hasher
+from django.core.management.base import BaseCommand
+
+from club_auth.hashers import TunedArgon2PasswordHasher, TunedScryptPasswordHasher
+
+PASSWORD = 'correct horse battery staple'
+
+
+def scrypt_variant(n):
+    return type('Scrypt', (TunedScryptPasswordHasher,), {'work_factor': n, 'maxmem': 256 * n * TunedScryptPasswordHasher.block_size})
+
+
+def time_verify(hasher, encoded, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        hasher.verify(PASSWORD, encoded)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+class Command(BaseCommand):
+    help = "Measure password verification cost (logins/sec per core) for the available hashers and cost settings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--threads', type=int, default=0, help="Also measure aggregate throughput of the preferred hasher")
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        scrypt = TunedScryptPasswordHasher
+        candidates = [
+            ('PBKDF2 (previous default)', PBKDF2PasswordHasher, f"{PBKDF2PasswordHasher.iterations} iterations", None),
+            ('scrypt N/2', scrypt_variant(scrypt.work_factor // 2), None, scrypt.work_factor // 2),
+            ('scrypt (configured)', scrypt, None, scrypt.work_factor),
+            ('scrypt 2N', scrypt_variant(scrypt.work_factor * 2), None, scrypt.work_factor * 2),
+        ]
+        argon2 = TunedArgon2PasswordHasher
+        try:
+            argon2()._load_library()
+            candidates.append(('argon2id (configured)', argon2, f"t={argon2.time_cost} m={argon2.memory_cost} KiB p={argon2.parallelism}", None))
+        except ValueError:
+            self.stdout.write("argon2-cffi is not installed; skipping Argon2")
+
+        for label, hasher_class, params, n in candidates:
+            hasher = hasher_class()
+            if n is not None:
+                params = f"N={n} r={scrypt.block_size} p={scrypt.parallelism}, {128 * n * scrypt.block_size // 2**20} MiB"
+            encoded = hasher.encode(PASSWORD, hasher.salt())
+            seconds = time_verify(hasher, encoded, repeat)
+            self.stdout.write(f"{label:>26}: {seconds * 1000:7.1f} ms/login  {1 / seconds:7.1f} logins/s/core  ({params})")
+
+        # What an existing member's first login costs after the switch: verify the
+        # old PBKDF2 hash, then rehash with the preferred hasher
+        legacy = PBKDF2PasswordHasher().encode(PASSWORD, PBKDF2PasswordHasher().salt())
+        upgraded = []
+        started = time.perf_counter()
+        check_password(PASSWORD, legacy, setter=upgraded.append)
+        first = time.perf_counter() - started
+        preferred = get_hasher()
+        second = time_verify(preferred, preferred.encode(upgraded[0], preferred.salt()), repeat) if upgraded else 0
+        self.stdout.write(f"Upgrade on login: first login {first * 1000:.1f} ms (rehashed to {preferred.algorithm}), later logins {second * 1000:.1f} ms")
+
+        if options['threads']:
+            encoded = preferred.encode(PASSWORD, preferred.salt())
+            count = options['threads'] * repeat
+            started = time.perf_counter()
+            with ThreadPoolExecutor(options['threads']) as pool:
+                list(pool.map(lambda _: preferred.verify(PASSWORD, encoded), range(count)))
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{options['threads']} threads: {count / elapsed:.1f} logins/s with {preferred.algorithm}")
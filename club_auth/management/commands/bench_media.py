@@ -0,0 +1,107 @@
+import gzip
+import io
+import os
+import statistics
+import tempfile
+import time
+from wsgiref.util import FileWrapper
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import re_path
+from django.views.static import serve
+
+HOST = 'testserver'
+
+
+def baseline_serve(request, path):
+    return serve(request, path, document_root=settings.MEDIA_ROOT)
+
+
+# The previous setup: static() in club_auth/urls.py, i.e. django.views.static.serve behind the full stack
+urlpatterns = [re_path(r'^media/(?P<path>.*)$', baseline_serve)]
+
+
+def wsgi_get(handler, path, headers):
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SERVER_NAME': HOST, 'SERVER_PORT': '80',
+        'HTTP_HOST': HOST, 'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http', 'wsgi.errors': io.StringIO(),
+        'wsgi.file_wrapper': FileWrapper,
+    }
+    environ.update(headers)
+    statuses = []
+    body = handler(environ, lambda status, response_headers: statuses.append(status))
+    size = sum(len(chunk) for chunk in body)
+    if hasattr(body, 'close'):
+        body.close()
+    return int(statuses[0].split()[0]), size
+
+
+class Command(BaseCommand):
+    help = "Compare django.views.static.serve with MediaFilesMiddleware on full, conditional, range and precompressed requests."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as root:
+            self.write_files(root)
+            stack = [m for m in settings.MIDDLEWARE if m != 'cseClub.media.MediaFilesMiddleware']
+            configurations = (
+                ('static.serve', {'MIDDLEWARE': stack, 'ROOT_URLCONF': __name__}),
+                ('middleware', {}),
+            )
+            for label, overrides in configurations:
+                with override_settings(MEDIA_ROOT=root, DEBUG=False, ALLOWED_HOSTS=[HOST], **overrides):
+                    handler = WSGIHandler()
+                    etag = self.etag(handler)
+                    self.stdout.write(label)
+                    for case, path, headers in self.cases(etag):
+                        self.report(case, handler, path, headers, options['requests'])
+
+    @staticmethod
+    def write_files(root):
+        os.makedirs(os.path.join(root, 'avatars'))
+        with open(os.path.join(root, 'avatars', 'avatar.jpeg'), 'wb') as small:
+            small.write(os.urandom(4 * 1024))
+        with open(os.path.join(root, 'video.mp4'), 'wb') as large:
+            large.write(os.urandom(4 * 1024 * 1024))
+        stylesheet = b'.post { margin: 0 auto; padding: 1rem; }\n' * 2000
+        with open(os.path.join(root, 'site.css'), 'wb') as css:
+            css.write(stylesheet)
+        with open(os.path.join(root, 'site.css.gz'), 'wb') as css:
+            css.write(gzip.compress(stylesheet))
+
+    @staticmethod
+    def etag(handler):
+        captured = []
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': '/media/avatars/avatar.jpeg', 'SERVER_NAME': HOST, 'SERVER_PORT': '80',
+            'HTTP_HOST': HOST, 'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http', 'wsgi.errors': io.StringIO(),
+        }
+        handler(environ, lambda status, headers: captured.extend(headers)).close()
+        headers = dict(captured)
+        return {'HTTP_IF_NONE_MATCH': headers['ETag']} if 'ETag' in headers else {'HTTP_IF_MODIFIED_SINCE': headers['Last-Modified']}
+
+    @staticmethod
+    def cases(conditional):
+        return (
+            ('4 KiB avatar', '/media/avatars/avatar.jpeg', {}),
+            ('revalidation', '/media/avatars/avatar.jpeg', conditional),
+            ('4 MiB file', '/media/video.mp4', {}),
+            ('64 KiB range', '/media/video.mp4', {'HTTP_RANGE': 'bytes=1048576-1114111'}),
+            ('css, gzip', '/media/site.css', {'HTTP_ACCEPT_ENCODING': 'gzip, br'}),
+        )
+
+    def report(self, case, handler, path, headers, count):
+        latencies = []
+        for _ in range(count):
+            started = time.perf_counter()
+            status, size = wsgi_get(handler, path, headers)
+            latencies.append(time.perf_counter() - started)
+        self.stdout.write(
+            f"  {case:>14}: {count / sum(latencies):8.0f} req/s  p50 {statistics.median(latencies) * 1000:6.2f} ms  "
+            f"status {status}  {size} bytes"
+        )
@@ -0,0 +1,26 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from club_auth.avatars import get_pool, process_avatar
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnails for avatars that have none yet (e.g. uploaded before the pipeline existed)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Reprocess every avatar, not just those without thumbnails")
+
+    def handle(self, *args, **options):
+        users = User.objects.exclude(avatar='').exclude(avatar__isnull=True)
+        if not options['all']:
+            users = users.filter(avatar_hash='')
+        # Most members share the default avatar: each distinct file is processed once
+        names = list(users.order_by().values_list('avatar', flat=True).distinct())
+
+        started = time.perf_counter()
+        updated = sum(count or 0 for count in get_pool().map(process_avatar, names))
+        self.stdout.write(f"Processed {len(names)} avatar files for {updated} members in {time.perf_counter() - started:.2f}s")
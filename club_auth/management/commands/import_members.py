@@ -0,0 +1,185 @@
+import csv
+import json
+import os
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from club_auth.hashers import TunedScryptPasswordHasher
+
+User = get_user_model()
+
+COLUMNS = ('studentId', 'name', 'email', 'year', 'semester', 'role')
+
+
+class GeneratedPasswordHasher(TunedScryptPasswordHasher):
+    # Cheap enough to hash thousands per second. Only used for generated
+    # passwords, whose 96 random bits make the KDF cost irrelevant;
+    # must_update() upgrades the hash to the configured cost on first login.
+    work_factor = 2**8
+
+
+def _init_worker():
+    django.setup()
+
+
+def _hash(item):
+    password, generated = item
+    if generated:
+        return GeneratedPasswordHasher().encode(password, GeneratedPasswordHasher().salt())
+    return make_password(password)
+
+
+def _optional_int(value, field):
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError(f"{field} must be a number")
+
+
+def _messages(error):
+    if hasattr(error, 'error_dict'):
+        return [f"{field}: {message}" for field, messages in error.message_dict.items() for message in messages]
+    return error.messages
+
+
+class Command(BaseCommand):
+    help = (
+        "Import members from a CSV with columns studentId, name, email, year, semester, role "
+        "(and optionally password). Members without a password get a generated one, written to --credentials."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Password hashing processes")
+        parser.add_argument('--credentials', help="CSV to append generated studentId,password pairs to")
+        parser.add_argument('--dry-run', action='store_true', help="Validate only; nothing is hashed or written")
+        parser.add_argument('--restart', action='store_true', help="Ignore saved progress and start from the first row")
+
+    def handle(self, *args, **options):
+        path = options['csv_path']
+        progress_path = path + '.progress'
+        dry_run = options['dry_run']
+        if not dry_run and not options['credentials']:
+            raise CommandError("--credentials is required so generated passwords can be handed out")
+
+        done = 0
+        if os.path.exists(progress_path) and not options['restart'] and not dry_run:
+            with open(progress_path) as progress:
+                done = json.load(progress)['rows']
+            self.stdout.write(f"Resuming after row {done}")
+
+        started = time.perf_counter()
+        totals = {'imported': 0, 'skipped': 0, 'invalid': 0}
+        seen_ids, seen_emails = set(), set()
+        pool = None if dry_run else ProcessPoolExecutor(options['workers'], initializer=_init_worker)
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as source:
+                reader = csv.DictReader(source)
+                missing = set(COLUMNS) - set(reader.fieldnames or ())
+                if missing:
+                    raise CommandError(f"Missing columns: {', '.join(sorted(missing))}")
+
+                rows = islice(reader, done, None)
+                while batch := list(islice(rows, options['batch_size'])):
+                    users, passwords = self.validate(batch, done + 2, seen_ids, seen_emails, totals)
+                    done += len(batch)
+                    if dry_run:
+                        totals['imported'] += len(users)
+                        continue
+
+                    hashes = pool.map(_hash, passwords, chunksize=max(1, len(passwords) // (options['workers'] * 4)))
+                    for user, encoded in zip(users, hashes):
+                        user.password = encoded
+                    # Credentials go to disk before the commit so an imported member's
+                    # password is never lost; a batch that fails to commit is retried
+                    # with new passwords, appended after the stale lines.
+                    self.save_credentials(options['credentials'], users, passwords)
+                    with transaction.atomic():
+                        User.objects.bulk_create(users)
+                    totals['imported'] += len(users)
+
+                    # A crash before the progress file is written re-reads the batch;
+                    # the existing-member check then skips what was already inserted
+                    with open(progress_path, 'w') as progress:
+                        json.dump({'rows': done}, progress)
+                    self.stdout.write(f"{done} rows processed, {totals['imported']} imported")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        if not dry_run and os.path.exists(progress_path):
+            os.remove(progress_path)
+        verb = "Would import" if dry_run else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {totals['imported']} members; "
+            f"{totals['skipped']} already existed, {totals['invalid']} invalid rows ({time.perf_counter() - started:.1f}s)"
+        ))
+
+    def validate(self, batch, first_line, seen_ids, seen_emails, totals):
+        """Build unsaved users for the valid, new rows of a batch; two queries per batch."""
+        candidates = []
+        for line, row in enumerate(batch, first_line):
+            try:
+                student_id = _optional_int(row['studentId'].strip(), 'studentId')
+                if student_id is None:
+                    raise ValidationError("studentId is required")
+                email = (row['email'] or '').strip() or None
+                user = User(
+                    studentId=student_id,
+                    name=(row['name'] or '').strip() or None,
+                    email=email,
+                    year=_optional_int(row['year'], 'year'),
+                    semester=_optional_int(row['semester'], 'semester'),
+                    role=(row['role'] or '').strip() or None,
+                )
+                # Lengths and formats (e.g. name over 255 characters, a malformed email);
+                # bulk_create would not check them and SQLite would store the row as is
+                user.clean_fields(exclude=['password'])
+            except ValidationError as error:
+                totals['invalid'] += 1
+                self.stderr.write(f"Line {line}: {'; '.join(_messages(error))}")
+                continue
+            if student_id in seen_ids or (email and email in seen_emails):
+                totals['invalid'] += 1
+                self.stderr.write(f"Line {line}: duplicate studentId or email within the file")
+                continue
+            seen_ids.add(student_id)
+            if email:
+                seen_emails.add(email)
+            candidates.append((user, (row.get('password') or '').strip()))
+
+        ids = [user.studentId for user, _ in candidates]
+        emails = [user.email for user, _ in candidates if user.email]
+        existing_ids = set(User.objects.filter(studentId__in=ids).values_list('studentId', flat=True))
+        existing_emails = set(User.objects.filter(email__in=emails).values_list('email', flat=True))
+
+        users, passwords = [], []
+        for user, password in candidates:
+            if user.studentId in existing_ids or user.email in existing_emails:
+                totals['skipped'] += 1
+                continue
+            users.append(user)
+            passwords.append((password, False) if password else (secrets.token_urlsafe(12), True))
+        return users, passwords
+
+    @staticmethod
+    def save_credentials(path, users, passwords):
+        with open(path, 'a', newline='') as credentials:
+            writer = csv.writer(credentials)
+            for user, (password, generated) in zip(users, passwords):
+                if generated:
+                    writer.writerow([user.studentId, password])
+            credentials.flush()
+            os.fsync(credentials.fileno())
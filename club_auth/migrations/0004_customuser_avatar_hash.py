@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('club_auth', '0003_alter_customuser_avatar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='avatar_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+    ]
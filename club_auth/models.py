@@ -1,5 +1,6 @@
 from django.contrib.auth.models import BaseUserManager, AbstractUser
 from django.db import models
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, studentId, password=None, **extra_fields):
@@ -30,6 +31,8 @@ class CustomUser(AbstractUser):
     github = models.URLField(blank=True, null=True)
     linkedin = models.URLField(blank=True, null=True)
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True, default="avatars/avatar.jpeg")
+    # Content hash of the avatar once its thumbnails exist (see club_auth.avatars); empty until then
+    avatar_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
 
     objects = CustomUserManager()  # Use the new manager
 
@@ -38,3 +41,18 @@ class CustomUser(AbstractUser):
 
     def __str__(self):
         return f"{self.studentId} - {self.name}"
+
+
+class LoggedOutToken(models.Model):
+    """
+    A refresh token blacklisted by logout rather than by rotation.
+
+    Access tokens minted from it are rejected too (see
+    club_auth.authentication.is_revoked); those minted from a rotated-out
+    token stay valid until they expire.
+    """
+    token = models.OneToOneField(OutstandingToken, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Logged out token for {self.token.user}"
@@ -0,0 +1,73 @@
+from functools import lru_cache
+
+from django.contrib.auth import get_user_model
+
+from .avatars import embed_url, thumbnail_urls
+
+User = get_user_model()
+
+# Projections of CustomUser built from .values() rows, shared by the login
+# payload, the blog author embeds and anything else that shows a member.
+# Rows are plain dicts, so no model instances are created per user.
+
+PROFILE_VALUES = (
+    'id', 'studentId', 'name', 'email', 'role', 'bio', 'year', 'semester',
+    'interests', 'skills', 'github', 'linkedin', 'avatar', 'avatar_hash',
+)
+SUMMARY_VALUES = ('id', 'name', 'role', 'avatar', 'avatar_hash')
+
+
+@lru_cache(maxsize=4096)
+def avatar_url(name):
+    # Most members share the default avatar, so storage.url() is rarely recomputed
+    return User._meta.get_field('avatar').storage.url(name) if name else None
+
+
+def related_values(prefix, fields=SUMMARY_VALUES):
+    """The .values() names for fields reached through a foreign key, e.g. author_id, author__name."""
+    return tuple(f'{prefix}_id' if field == 'id' else f'{prefix}__{field}' for field in fields)
+
+
+def summary(user_id, name, role, avatar, avatar_hash=''):
+    return {
+        'id': user_id,
+        'name': name,
+        'role': role,
+        # Embeds are shown as small icons: the EMBED_SIZE thumbnail once it exists
+        'avatar': embed_url(avatar_hash) if avatar_hash else avatar_url(avatar),
+    }
+
+
+def project_summary(row, prefix=None):
+    """Summary from a SUMMARY_VALUES row, or from related_values(prefix) columns of another model's row."""
+    if prefix is None:
+        return summary(row['id'], row['name'], row['role'], row['avatar'], row['avatar_hash'])
+    return summary(
+        row[f'{prefix}_id'], row[f'{prefix}__name'], row[f'{prefix}__role'], row[f'{prefix}__avatar'], row[f'{prefix}__avatar_hash'],
+    )
+
+
+def project_profile(row):
+    return {
+        'studentId': row['studentId'],
+        'name': row['name'],
+        'email': row['email'],
+        'role': row['role'],
+        'bio': row['bio'],
+        'year': row['year'],
+        'semester': row['semester'],
+        'interests': row['interests'],
+        'skills': row['skills'],
+        'github': row['github'],
+        'linkedin': row['linkedin'],
+        'avatar': avatar_url(row['avatar']),
+        'avatar_thumbnails': thumbnail_urls(row['avatar_hash']) if row['avatar_hash'] else None,
+    }
+
+
+def user_profile(user):
+    """Profile of a user instance already in memory, e.g. the one authenticate() returned."""
+    row = {field: getattr(user, field) for field in PROFILE_VALUES}
+    row['avatar'] = user.avatar.name
+    return project_profile(row)
+
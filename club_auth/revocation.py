@@ -0,0 +1,148 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from .models import LoggedOutToken
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationFilter:
+    """
+    Answers "is this refresh jti in model?" mostly without the database.
+
+    model has a row per outstanding token (see LoggedOutToken). Meant for the
+    per-request access token check, where a short lag is acceptable; refresh
+    tokens are checked against the database.
+    A bloom filter over their jtis rules out almost every lookup; only its
+    (rare, ~ERROR_RATE) positives go to the indexed query, and those answers
+    are kept in a small LRU. The filter picks up rows added by other
+    processes every SYNC_INTERVAL seconds by loading ids above the last one
+    seen, and is rebuilt from scratch every REBUILD_INTERVAL so compacted
+    rows drop out. A token logged out in another process is therefore
+    accepted here for at most SYNC_INTERVAL seconds.
+    """
+
+    def __init__(self, options, model):
+        self.options = options
+        self.model = model
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(options['BLOOM_CAPACITY'], options['BLOOM_ERROR_RATE'])
+        self._last_id = 0
+        self._synced_at = self._rebuilt_at = None
+        self._answers = OrderedDict()  # jti -> revoked, for bloom positives only
+        self._stats = {'lookups': 0, 'bloom_negatives': 0, 'cache_hits': 0, 'db_lookups': 0, 'revoked': 0, 'db_seconds': 0.0}
+
+    def _remember(self, jti, revoked):
+        self._answers[jti] = revoked
+        self._answers.move_to_end(jti)
+        while len(self._answers) > self.options['CACHE_SIZE']:
+            self._answers.popitem(last=False)
+
+    def sync(self, force_rebuild=False):
+        now = time.monotonic()
+        rebuild = force_rebuild or self._rebuilt_at is None or now - self._rebuilt_at >= self.options['REBUILD_INTERVAL']
+        last_id = 0 if rebuild else self._last_id
+        rows = list(self.model.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'token__jti'))
+
+        with self._lock:
+            if rebuild:
+                capacity = max(self.options['BLOOM_CAPACITY'], 2 * len(rows))
+                self._bloom = BloomFilter(capacity, self.options['BLOOM_ERROR_RATE'])
+                self._answers.clear()
+                self._last_id = 0
+                self._rebuilt_at = now
+            for pk, jti in rows:
+                self._bloom.add(jti)
+                if jti in self._answers:
+                    self._remember(jti, True)
+            if rows:
+                self._last_id = rows[-1][0]
+            self._synced_at = now
+        return len(rows)
+
+    def sync_due(self):
+        return self._synced_at is None or time.monotonic() - self._synced_at >= self.options['SYNC_INTERVAL']
+
+    def check(self, jti):
+        """Return True or False, or None when the database has to decide (see is_revoked)."""
+        with self._lock:
+            self._stats['lookups'] += 1
+            if jti not in self._bloom:
+                self._stats['bloom_negatives'] += 1
+                return False
+            if jti in self._answers:
+                self._stats['cache_hits'] += 1
+                self._answers.move_to_end(jti)
+                return self._answers[jti]
+        return None
+
+    def record(self, jti, revoked, seconds):
+        with self._lock:
+            self._stats['db_lookups'] += 1
+            self._stats['db_seconds'] += seconds
+            self._stats['revoked'] += revoked
+            self._remember(jti, revoked)
+
+    def add(self, jti):
+        # Added by this process: no need to wait for the next sync
+        with self._lock:
+            self._bloom.add(jti)
+            self._remember(jti, True)
+
+    def is_revoked(self, jti):
+        if self.sync_due():
+            self.sync()
+        revoked = self.check(jti)
+        if revoked is None:
+            started = time.perf_counter()
+            revoked = self.model.objects.filter(token__jti=jti).exists()
+            self.record(jti, revoked, time.perf_counter() - started)
+        return revoked
+
+    async def ais_revoked(self, jti):
+        if self.sync_due():
+            await sync_to_async(self.sync)()
+        revoked = self.check(jti)
+        if revoked is None:
+            started = time.perf_counter()
+            revoked = await self.model.objects.filter(token__jti=jti).aexists()
+            self.record(jti, revoked, time.perf_counter() - started)
+        return revoked
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['bloom_entries'] = self._bloom.count
+            stats['bloom_bytes'] = len(self._bloom.bits)
+            stats['cached_answers'] = len(self._answers)
+        stats['db_avg_ms'] = stats['db_seconds'] / stats['db_lookups'] * 1000 if stats['db_lookups'] else 0.0
+        return stats
+
+
+# Logged out refresh tokens: checked for every access token
+logouts = RevocationFilter(settings.TOKEN_REVOCATION, LoggedOutToken)
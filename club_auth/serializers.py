@@ -17,14 +17,10 @@ class UserSerializer(serializers.ModelSerializer):
         }
 
     def create(self, validated_data):
-        avatar = validated_data.pop('avatar', None)  # Handle avatar upload
-        password = validated_data.pop('password')  # Pop the password from validated_data
-        user = User.objects.create(**validated_data)
-        user.set_password(password)  # Set the password using set_password method
-        if avatar:
-            user.avatar = avatar
-        user.save()  # Save the user instance with the hashed password
-        return user
+        if not validated_data.get('avatar'):
+            validated_data.pop('avatar', None)  # Keep the model's default avatar
+        # create_user hashes the password before the INSERT: one write per user
+        return User.objects.create_user(**validated_data)
     
 
     
@@ -36,11 +32,10 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         fields = ['studentId', 'name', 'email', 'password']
 
     def create(self, validated_data):
-        user = User.objects.create(
+        # create_user hashes the password before the INSERT: one write per user
+        return User.objects.create_user(
             studentId=validated_data['studentId'],
+            password=validated_data['password'],
             name=validated_data['name'],
             email=validated_data['email'],
         )
-        user.set_password(validated_data['password'])  # Hash the password
-        user.save()
-        return user
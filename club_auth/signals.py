@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .authentication import user_cache
+from .avatars import schedule_avatar
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def discard_cached_user(sender, instance, **kwargs):
+    user_cache.discard(instance.pk)
+
+
+@receiver(pre_save, sender=User)
+def reset_avatar_hash(sender, instance, **kwargs):
+    # A new upload is stored by the field's pre_save, after this receiver runs.
+    # Until its thumbnails exist the member is shown with the original image.
+    if not instance.avatar:
+        instance.avatar_hash = ''
+    elif not instance.avatar._committed:
+        instance.avatar_hash = ''
+        instance._avatar_uploaded = True
+
+
+@receiver(post_save, sender=User)
+def process_uploaded_avatar(sender, instance, **kwargs):
+    if getattr(instance, '_avatar_uploaded', False):
+        del instance._avatar_uploaded
+        schedule_avatar(instance.avatar.name)
@@ -1,3 +1,189 @@
-from django.test import TestCase
+import csv
+import os
+import shutil
+import tempfile
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from .authentication import ClubRefreshToken, user_cache
+from .models import LoggedOutToken
+from .revocation import RevocationFilter, logouts
+
+User = get_user_model()
+
+
+# Query budgets per endpoint, as in club_blog.tests. A cheap hasher keeps the
+# suite fast; it does not change the number of queries.
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AuthQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = User.objects.create_user(studentId=700001, password='secret', name='Member', email='member@example.com')
+
+    def setUp(self):
+        user_cache.clear()
+        logouts.sync(force_rebuild=True)
+        self.refresh = ClubRefreshToken.for_user(self.member)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {self.refresh.access_token}'}
+
+    @contextmanager
+    def assertMaxQueries(self, limit):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        executed = len(context)
+        self.assertLessEqual(
+            executed, limit,
+            f"{executed} queries, budget is {limit}:\n" + '\n'.join(query['sql'] for query in context.captured_queries),
+        )
+
+    def test_register(self):
+        data = {'studentId': 700002, 'name': 'New', 'email': 'new@example.com', 'password': 'secret'}
+        with self.assertMaxQueries(3):  # Two uniqueness checks and the INSERT
+            response = self.client.post(reverse('register'), data)
+        self.assertEqual(response.status_code, 201)
+
+    def test_login(self):
+        with self.assertMaxQueries(2):
+            response = self.client.post(reverse('login'), {'studentId': 700001, 'password': 'secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['studentId'], 700001)
+
+    def test_logout(self):
+        with self.assertMaxQueries(7):  # Refresh tokens are checked against the blacklist table itself
+            response = self.client.post(reverse('logout'), {'refresh_token': str(self.refresh)}, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        # The access tokens minted from the logged out refresh token are revoked with it
+        self.assertEqual(self.client.get('/auth/check/', **self.auth).status_code, 401)
+
+    def test_check(self):
+        # Claims come from the token: no user or blacklist query
+        with self.assertMaxQueries(0):
+            response = self.client.get('/auth/check/', **self.auth)
+        self.assertEqual(response.status_code, 200)
+        with self.assertMaxQueries(0):
+            self.assertEqual(self.client.get('/auth/check/').status_code, 401)
+
+    def test_check_async(self):
+        with self.assertMaxQueries(0):
+            response = self.client.get(reverse('check_async'), **self.auth)
+        self.assertEqual(response.status_code, 200)
+
+    def test_token_obtain_pair(self):
+        for url in ('/auth/api/token/', '/api/token/'):
+            with self.assertMaxQueries(2):
+                response = self.client.post(url, {'studentId': 700001, 'password': 'secret'})
+            self.assertEqual(response.status_code, 200)
+
+    def test_token_refresh(self):
+        with self.assertMaxQueries(8):
+            response = self.client.post('/auth/api/token/refresh/', {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, 200)
+        # The rotated-out token is now rejected, but its access token lives until it expires
+        response = self.client.post('/auth/api/token/refresh/', {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.client.get('/auth/check/', **self.auth).status_code, 200)
+
+
+class RevocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = User.objects.create_user(studentId=700001, password='secret', email='member@example.com')
+
+    def outstanding(self, expires_in, logged_out=False):
+        now = timezone.now()
+        token = OutstandingToken.objects.create(
+            user=self.member, jti=uuid.uuid4().hex, token='token', created_at=now, expires_at=now + timedelta(seconds=expires_in),
+        )
+        if logged_out:
+            BlacklistedToken.objects.create(token=token)
+            LoggedOutToken.objects.create(token=token)
+        return token
+
+    def test_revoked_jti_is_reported(self):
+        revoked, live = self.outstanding(3600, logged_out=True), self.outstanding(3600)
+        revocation_filter = RevocationFilter(settings.TOKEN_REVOCATION, LoggedOutToken)
+        revocation_filter.sync()
+        with self.assertNumQueries(1):  # The bloom positive is confirmed once, then answered from the LRU
+            self.assertTrue(revocation_filter.is_revoked(revoked.jti))
+            self.assertTrue(revocation_filter.is_revoked(revoked.jti))
+        with self.assertNumQueries(0):
+            self.assertFalse(revocation_filter.is_revoked(live.jti))
+
+    def test_bloom_positive_falls_through_to_database(self):
+        revocation_filter = RevocationFilter(settings.TOKEN_REVOCATION, LoggedOutToken)
+        revocation_filter.sync()
+        revocation_filter._bloom.add('unknown')  # A false positive
+        with self.assertNumQueries(1):
+            self.assertFalse(revocation_filter.is_revoked('unknown'))
+        self.assertEqual(revocation_filter.stats()['db_lookups'], 1)
+
+    def test_refresh_token_is_rotated_once(self):
+        # Two workers refreshing the same token: both pass check_blacklist before either has
+        # blacklisted it, and only the blacklist row's uniqueness stops the second one
+        refresh = str(ClubRefreshToken.for_user(self.member))
+        with mock.patch.object(ClubRefreshToken, 'check_blacklist'):
+            self.assertEqual(self.client.post('/auth/api/token/refresh/', {'refresh': refresh}).status_code, 200)
+            self.assertEqual(self.client.post('/auth/api/token/refresh/', {'refresh': refresh}).status_code, 401)
+        self.assertEqual(OutstandingToken.objects.count(), 2)
+
+    def test_compaction_deletes_only_expired_rows(self):
+        expired = [self.outstanding(-3600, logged_out=index % 2 == 0) for index in range(5)]
+        live = [self.outstanding(3600, logged_out=True), self.outstanding(3600)]
+        output = StringIO()
+        call_command('compact_token_blacklist', batch_size=2, pause=0, grace=0, stdout=output)
+        self.assertIn('Deleted 5 expired outstanding tokens (3 blacklisted, 3 logged out) in 3 batches', output.getvalue())
+        self.assertEqual(set(OutstandingToken.objects.all()), set(live))
+        self.assertEqual(BlacklistedToken.objects.get().token, live[0])
+        self.assertEqual(LoggedOutToken.objects.get().token, live[0])
+        self.assertFalse(OutstandingToken.objects.filter(pk__in=[token.pk for token in expired]).exists())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportMembersTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.csv_path = os.path.join(directory, 'members.csv')
+        self.credentials = os.path.join(directory, 'credentials.csv')
+        User.objects.create_user(studentId=700009, password='secret', email='existing@example.com')
+
+    def import_rows(self, rows):
+        with open(self.csv_path, 'w', newline='', encoding='utf-8') as source:
+            writer = csv.writer(source)
+            writer.writerow(['studentId', 'name', 'email', 'year', 'semester', 'role', 'password'])
+            writer.writerows(rows)
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_members', self.csv_path, credentials=self.credentials, workers=1, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_good_duplicate_and_invalid_rows(self):
+        stdout, stderr = self.import_rows([
+            [700001, 'Good', 'good@example.com', 2, 1, 'member', ''],
+            [700002, 'Also good', '', '', '', '', 'chosen'],
+            [700001, 'Duplicate', 'other@example.com', 2, 1, 'member', ''],
+            [700009, 'Existing', '', '', '', '', ''],
+            [700003, 'x' * 256, '', '', '', '', ''],
+            [700004, 'Long role', '', '', '', 'r' * 51, ''],
+            [700005, 'Bad email', 'not-an-email', '', '', '', ''],
+            ['abc', 'Bad id', '', '', '', '', ''],
+        ])
+        self.assertIn("Imported 2 members; 1 already existed, 5 invalid rows", stdout)
+        self.assertIn("Line 6: name: Ensure this value has at most 255 characters", stderr)
+        self.assertIn("Line 7: role: Ensure this value has at most 50 characters", stderr)
+        self.assertEqual(set(User.objects.values_list('studentId', flat=True)), {700001, 700002, 700009})
+        self.assertTrue(User.objects.get(studentId=700002).check_password('chosen'))
+        with open(self.credentials, newline='') as credentials:
+            self.assertEqual([row[0] for row in csv.reader(credentials)], ['700001'])
@@ -1,14 +1,16 @@
 from django.urls import path
-from .views import register, login, check
-from django.conf import settings
-from django.conf.urls.static import static
+from .views import register, login, logout, check
+from .async_views import check as check_async
+from .hashers import hashing_slot
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 urlpatterns = [
     path('register/', register, name='register'),
     path('login/', login, name='login'),
+    path('logout/', logout, name='logout'),
     path('check/',check),
-    path("api/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
+    path('async/check/', check_async, name='check_async'),
+    path("api/token/", hashing_slot(TokenObtainPairView.as_view()), name="token_obtain_pair"),
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
-]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
 
@@ -1,11 +1,14 @@
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.decorators import api_view, permission_classes
 from django.contrib.auth import authenticate
 from .serializers import UserRegistrationSerializer
+from .authentication import ClubRefreshToken
+from .hashers import hashing_slot
+from .profiles import user_profile
 
+@hashing_slot
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def register(request):
@@ -17,6 +20,7 @@ def register(request):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 # Login view to authenticate and return a JWT token
+@hashing_slot
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def login(request):
@@ -28,36 +32,20 @@ def login(request):
 
     if user:
         # Generate JWT token for the authenticated user
-        refresh = RefreshToken.for_user(user)
+        refresh = ClubRefreshToken.for_user(user)
         access_token = str(refresh.access_token)
 
-        # Prepare user data to send with the response
-        user_data = {
-            "studentId": user.studentId,
-            "name": user.name,
-            "email": user.email,
-            "role": user.role,
-            "bio": user.bio,
-            "year": user.year,
-            "semester": user.semester,
-            "interests": user.interests,
-            "skills": user.skills,
-            "github": user.github,
-            "linkedin": user.linkedin,
-            "avatar": user.avatar.url if user.avatar else None  # Return avatar URL if exists
-        }
-
         return Response({
             "message": "Login successful",
             "access_token": access_token,  # Send the token in the response
             "refresh_token": str(refresh),  # Include refresh token for logout
-            "user": user_data  # Include user data in the response
+            "user": user_profile(user)  # Include user data in the response
         }, status=status.HTTP_200_OK)
 
     return Response({"error": "Invalid studentId or password"}, status=status.HTTP_400_BAD_REQUEST)
 
 
-# Logout view to blacklist the refresh token
+# Logout view to blacklist the refresh token and revoke its access tokens
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def logout(request):
@@ -66,8 +54,8 @@ def logout(request):
         if not refresh_token:
             return Response({"error": "Refresh token required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        token = RefreshToken(refresh_token)
-        token.blacklist()  # Blacklist the token to prevent reuse
+        token = ClubRefreshToken(refresh_token)
+        token.log_out()  # Blacklist the token to prevent reuse
 
         return Response({"message": "Logout successful"}, status=status.HTTP_200_OK)
 
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Post, Comment, Like
+from .counters import adjust_comment, adjust_post, release_likes
 
 class CommentInline(admin.TabularInline):
     model = Comment
@@ -12,12 +13,12 @@ class PostAdmin(admin.ModelAdmin):
     inlines = [CommentInline]
 
     def likes_count(self, obj):
-        return obj.likes.count()
+        return obj.like_count
 
     likes_count.short_description = 'Likes Count'
 
     def comments_count(self, obj):
-        return obj.comments.count()
+        return obj.comment_count
 
     comments_count.short_description = 'Comments Count'
 
@@ -29,7 +30,7 @@ class CommentAdmin(admin.ModelAdmin):
     list_filter = ['created_at']
 
     def likes_count(self, obj):
-        return obj.likes.count()
+        return obj.like_count
 
     likes_count.short_description = 'Likes Count'
 
@@ -39,4 +40,26 @@ class LikeAdmin(admin.ModelAdmin):
     list_display = ['user', 'post', 'comment', 'created_at']
     list_filter = ['created_at']
 
+    # Keep the denormalized counters in step with admin edits
+    def get_readonly_fields(self, request, obj=None):
+        if obj is not None:
+            return ['user', 'post', 'comment']
+        return []
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if not change:
+            if obj.post_id:
+                adjust_post(obj.post_id, like_count=1)
+            if obj.comment_id:
+                adjust_comment(obj.comment_id, like_count=1)
+
+    def delete_model(self, request, obj):
+        release_likes(Like.objects.filter(pk=obj.pk))
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        release_likes(queryset)
+        super().delete_queryset(request, queryset)
+
 admin.site.register(Like, LikeAdmin)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ClubBlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'club_blog'
+
+    def ready(self):
+        from . import signals  # noqa: F401
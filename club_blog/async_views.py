@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+
+from club_auth.async_views import authenticated_user_id
+
+from .cache import aget_or_build, conditional_json_response, feed_key, post_key
+from .comment_tree import (
+    assemble_comment_page, comment_page_query, preview_parent_ids, reply_previews_query, top_level_comments,
+)
+from .likes import awith_liked_by_me
+from .models import Post
+from .pagination import InvalidCursor, finish_page, get_page_size, keyset_page_query
+from .serializers import POST_VALUES, serialize_post_row
+
+# ASGI-native versions of the public read endpoints. DRF's @api_view cannot
+# wrap coroutines, so these are plain Django views returning the same JSON as
+# list_posts / get_post_details and using the async ORM throughout.
+
+
+@require_GET
+async def list_posts(request):
+    cursor = request.GET.get('cursor')
+    page_size = get_page_size(request.GET)
+
+    async def build():
+        query = keyset_page_query(Post.objects.values(*POST_VALUES), cursor, page_size)
+        page, next_cursor = finish_page([row async for row in query], page_size)
+        tz = timezone.get_current_timezone()
+        return {"results": [serialize_post_row(row, tz) for row in page], "next_cursor": next_cursor}
+
+    try:
+        etag, data = await aget_or_build(feed_key(cursor, page_size), settings.BLOG_CACHE['FEED_TIMEOUT'], build)
+    except InvalidCursor:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
+    user_id = await authenticated_user_id(request)
+    return conditional_json_response(request, *await awith_liked_by_me(user_id, etag, data))
+
+
+@require_GET
+async def get_post_details(request, post_id):
+    async def build():
+        post = await Post.objects.values(*POST_VALUES).aget(id=post_id)
+        post_data = serialize_post_row(post)
+        page_size, preview_size = settings.BLOG_COMMENT_PAGE_SIZE, settings.BLOG_REPLY_PREVIEW_SIZE
+        rows = [row async for row in comment_page_query(top_level_comments(post_id), None, page_size)]
+        previews = [row async for row in reply_previews_query(preview_parent_ids(rows, page_size), preview_size)] if rows else []
+        page = assemble_comment_page(rows, previews, page_size, preview_size)
+        post_data['comments'], post_data['comments_next_cursor'] = page['results'], page['next_cursor']
+        return post_data
+
+    try:
+        etag, post_data = await aget_or_build(post_key(post_id), settings.BLOG_CACHE['TIMEOUT'], build)
+    except Post.DoesNotExist:
+        return JsonResponse({"error": "Post not found"}, status=404)
+    user_id = await authenticated_user_id(request)
+    return conditional_json_response(request, *await awith_liked_by_me(user_id, etag, post_data))
@@ -0,0 +1,120 @@
+import hashlib
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from cseClub.renderers import dumps
+
+from .models import Comment
+
+FEED_GENERATION_KEY = 'blog:feed:generation'
+
+
+def blog_cache():
+    return caches[settings.BLOG_CACHE['ALIAS']]
+
+
+def post_key(post_id):
+    return f'blog:post:{post_id}'
+
+
+def feed_key(cursor, page_size):
+    # Bumping the generation orphans every cached feed page at once
+    generation = blog_cache().get_or_set(FEED_GENERATION_KEY, time.time_ns(), None)
+    cursor_hash = hashlib.sha1((cursor or '').encode()).hexdigest()
+    return f'blog:feed:{generation}:{page_size}:{cursor_hash}'
+
+
+def make_etag(data):
+    return '"%s"' % hashlib.sha1(dumps(data, sort_keys=True)).hexdigest()
+
+
+def derive_etag(etag, *parts):
+    # The etag of a variant of the body etag was computed for
+    return '"%s"' % hashlib.sha1(dumps([etag, *parts])).hexdigest()
+
+
+def get_or_build(key, timeout, build):
+    """
+    Return the cached (etag, data) entry for key, calling build() on a miss.
+
+    Exceptions from build() propagate and nothing is cached.
+    """
+    cache = blog_cache()
+    entry = cache.get(key)
+    if entry is None:
+        data = build()
+        entry = (make_etag(data), data)
+        cache.set(key, entry, timeout)
+    return entry
+
+
+async def aget_or_build(key, timeout, build):
+    """get_or_build() for async views; build is a coroutine function."""
+    # The configured backends are local, so the sync calls never block on the network
+    cache = blog_cache()
+    entry = cache.get(key)
+    if entry is None:
+        data = await build()
+        entry = (make_etag(data), data)
+        cache.set(key, entry, timeout)
+    return entry
+
+
+def etag_matches(request, etag):
+    # Weak comparison: CompressionMiddleware sends gzipped bodies with a W/ tag
+    tags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    return etag in tags or 'W/' + etag in tags
+
+
+def conditional_response(request, etag, data):
+    # Bodies differ per viewer (liked_by_me), hence Vary: Authorization
+    if etag_matches(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag, 'Vary': 'Authorization'})
+    return Response(data, status=status.HTTP_200_OK, headers={'ETag': etag, 'Vary': 'Authorization'})
+
+
+def conditional_json_response(request, etag, data):
+    # Plain Django variant for the async views, rendered like DRF's JSONRenderer
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(dumps(data), content_type='application/json')
+    response['ETag'] = etag
+    response['Vary'] = 'Authorization'
+    return response
+
+
+# Invalidation runs after commit so a concurrent read cannot re-cache the old rows
+
+def _delete_on_commit(keys):
+    keys = list(keys)
+    if keys:
+        transaction.on_commit(partial(blog_cache().delete_many, keys))
+
+
+def invalidate_posts(post_ids):
+    _delete_on_commit(post_key(post_id) for post_id in set(post_ids))
+
+
+def invalidate_comments(comment_ids):
+    post_ids = Comment.objects.filter(pk__in=comment_ids).values_list('post_id', flat=True).distinct()
+    invalidate_posts(post_ids)
+
+
+def invalidate_feed():
+    def bump():
+        cache = blog_cache()
+        try:
+            cache.incr(FEED_GENERATION_KEY)
+        except ValueError:
+            cache.set(FEED_GENERATION_KEY, time.time_ns(), None)
+
+    transaction.on_commit(bump)
@@ -0,0 +1,150 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Value, Window
+from django.db.models.functions import Concat, RowNumber, Substr
+from django.utils import timezone
+
+from .cache import invalidate_posts
+from .counters import adjust_comment, adjust_post
+from .models import Comment, Like, path_segment
+from .pagination import finish_page, keyset_page_query
+from .search import python_index
+from .serializers import COMMENT_VALUES, serialize_comment_row
+
+
+def child_path(parent):
+    """The (path, depth) of a new reply to parent, or of a top-level comment if parent is None."""
+    if parent is None:
+        return '', 0
+    return parent.path + path_segment(parent.pk), parent.depth + 1
+
+
+def descendants(comment):
+    """Every reply under comment, at any depth."""
+    # Segments are fixed width, so the paths under this comment all sort
+    # before the ones under the comment whose id comes next
+    return Comment.objects.filter(path__gte=comment.subtree_prefix, path__lt=comment.path + path_segment(comment.pk + 1))
+
+
+def subtree(comment):
+    """comment together with its descendants."""
+    return Comment.objects.filter(pk=comment.pk) | descendants(comment)
+
+
+def newest_replies(comment, limit):
+    """The limit most recent replies anywhere under comment, as comment rows."""
+    return descendants(comment).order_by('-created_at', '-id').values(*COMMENT_VALUES)[:limit]
+
+
+def top_level_comments(post_id):
+    return Comment.objects.filter(post_id=post_id, parent_comment__isnull=True).values(*COMMENT_VALUES)
+
+
+def direct_replies(comment_id):
+    return Comment.objects.filter(parent_comment_id=comment_id).values(*COMMENT_VALUES)
+
+
+def comment_page_query(comments, cursor, page_size):
+    # Comments read oldest first, like the thread they belong to
+    return keyset_page_query(comments, cursor, page_size, descending=False)
+
+
+def reply_previews_query(parent_ids, preview_size):
+    """
+    The first preview_size + 1 replies of each parent, oldest first, in one query.
+
+    The extra reply per parent tells whether more follow, as in keyset_page_query().
+    """
+    # Rank ids alone, from comment_replies_idx, then load only the previewed rows with their authors
+    rank = Window(RowNumber(), partition_by=F('parent_comment_id'), order_by=[F('created_at').asc(), F('id').asc()])
+    previewed = (
+        Comment.objects.filter(parent_comment_id__in=parent_ids)
+        .annotate(rank=rank).filter(rank__lte=preview_size + 1).values('id')
+    )
+    return Comment.objects.filter(id__in=previewed).order_by('parent_comment_id', 'created_at', 'id').values(*COMMENT_VALUES)
+
+
+def preview_parent_ids(rows, page_size):
+    return [row['id'] for row in rows[:page_size]]
+
+
+def assemble_comment_page(rows, previews, page_size, preview_size):
+    """
+    Serialize a page of comment rows with their reply previews.
+
+    Each comment carries its first replies and a replies_next_cursor for the
+    comment_replies endpoint; reply_count is the total. Returns the page as
+    {"results": [...], "next_cursor": ...}.
+    """
+    tz = timezone.get_current_timezone()
+    rows, next_cursor = finish_page(rows, page_size)
+    replies_by_parent = defaultdict(list)
+    for reply in previews:
+        replies_by_parent[reply['parent_comment_id']].append(reply)
+
+    results = []
+    for row in rows:
+        node = serialize_comment_row(row, tz)
+        replies, node['replies_next_cursor'] = finish_page(replies_by_parent[row['id']], preview_size)
+        node['replies'] = [serialize_comment_row(reply, tz) for reply in replies]
+        results.append(node)
+    return {"results": results, "next_cursor": next_cursor}
+
+
+def comment_page(comments, cursor, page_size, preview_size):
+    """
+    A page of comments with reply previews, in two queries whatever the size of the discussion.
+
+    comments is top_level_comments() or direct_replies(); raises InvalidCursor.
+    """
+    rows = list(comment_page_query(comments, cursor, page_size))
+    previews = list(reply_previews_query(preview_parent_ids(rows, page_size), preview_size)) if rows else []
+    return assemble_comment_page(rows, previews, page_size, preview_size)
+
+
+def delete_subtree(comment):
+    """
+    Delete comment and every reply under it; returns the number of comments deleted.
+
+    A fixed number of statements whatever the size of the subtree: the likes
+    and the comments go in one DELETE each and the counters are adjusted once.
+    It bypasses the Comment delete receivers, so the accounting is done here.
+    """
+    comments = subtree(comment)
+    with transaction.atomic():
+        python_index.discard('comment', comments)
+        Like.objects.filter(comment__in=comments.values('id')).delete()
+        # The replies and likes are gone with the same statements, so there is nothing left to cascade to
+        deleted = comments._raw_delete(comments.db)
+        adjust_post(comment.post_id, comment_count=-deleted)
+        if comment.parent_comment_id:
+            adjust_comment(comment.parent_comment_id, reply_count=-1)
+        invalidate_posts([comment.post_id])
+    return deleted
+
+
+def move_subtree(comment, old_parent_id):
+    """
+    Move the replies under comment after its parent_comment changed from old_parent_id.
+
+    Called by the Comment pre_save receiver, so reattaching a comment is just
+    setting parent_comment and saving, inside a transaction. Rewrites the
+    paths below it with one UPDATE and moves the reply count.
+    """
+    parent = comment.parent_comment
+    error = comment.parent_error(parent)
+    if error:
+        raise ValueError(error)
+    prefix = comment.subtree_prefix
+    below = descendants(comment)
+    old_depth = comment.depth
+    comment.path, comment.depth = child_path(parent)
+    below.update(
+        path=Concat(Value(comment.subtree_prefix), Substr('path', len(prefix) + 1)),
+        depth=F('depth') + (comment.depth - old_depth),
+    )
+    if old_parent_id:
+        adjust_comment(old_parent_id, reply_count=-1)
+    if parent is not None:
+        adjust_comment(parent.pk, reply_count=1)
@@ -0,0 +1,94 @@
+from django.db import connection
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .cache import invalidate_comments, invalidate_posts
+from .models import Post, Comment, Like
+
+
+def _adjust(model, pk, deltas):
+    # Single UPDATE ... SET col = MAX(col + delta, 0); never reads the row
+    model.objects.filter(pk=pk).update(**{
+        field: Greatest(F(field) + delta, 0) for field, delta in deltas.items()
+    })
+
+
+def adjust_post(post_id, **deltas):
+    _adjust(Post, post_id, deltas)
+
+
+def adjust_comment(comment_id, **deltas):
+    _adjust(Comment, comment_id, deltas)
+
+
+def adjust_like_count(model, pk, delta):
+    """
+    Apply delta to model.like_count and return the new value.
+
+    Uses UPDATE ... RETURNING where the backend has it, so the write and the
+    read are one statement. Returns None if the row does not exist.
+    """
+    if not connection.features.can_return_columns_from_insert:
+        _adjust(model, pk, {'like_count': delta})
+        return model.objects.filter(pk=pk).values_list('like_count', flat=True).first()
+
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET like_count = CASE WHEN like_count + %s < 0 THEN 0 ELSE like_count + %s END "
+            f"WHERE id = %s RETURNING like_count",
+            [delta, delta, pk],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def release_likes(likes):
+    """
+    Take the given Like rows off their targets' counters.
+
+    Called before the rows are deleted outside the like/unlike views, e.g. when
+    the liking user is deleted or an admin removes likes.
+    """
+    grouped = likes.order_by().values('post_id', 'comment_id').annotate(n=Count('id'))
+    post_ids, comment_ids = [], []
+    for row in grouped:
+        if row['post_id']:
+            adjust_post(row['post_id'], like_count=-row['n'])
+            post_ids.append(row['post_id'])
+        if row['comment_id']:
+            adjust_comment(row['comment_id'], like_count=-row['n'])
+            comment_ids.append(row['comment_id'])
+    invalidate_posts(post_ids)
+    invalidate_comments(comment_ids)
+
+
+def _count(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(n=Count('*')).values('n')
+    ), 0)
+
+
+def rebuild_counters(post_ids=None, comment_ids=None):
+    """
+    Recompute every counter from the source tables in bulk.
+
+    Runs one UPDATE per model; pass ids to limit the rebuild to those rows.
+    Returns the number of (posts, comments) updated.
+    """
+    posts = Post.objects.all()
+    if post_ids is not None:
+        posts = posts.filter(pk__in=post_ids)
+    comments = Comment.objects.all()
+    if comment_ids is not None:
+        comments = comments.filter(pk__in=comment_ids)
+
+    updated_posts = posts.update(
+        like_count=_count(Like.objects.all(), 'post'),
+        comment_count=_count(Comment.objects.all(), 'post'),
+    )
+    updated_comments = comments.update(
+        like_count=_count(Like.objects.all(), 'comment'),
+        reply_count=_count(Comment.objects.all(), 'parent_comment'),
+    )
+    return updated_posts, updated_comments
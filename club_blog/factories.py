@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+
+from .counters import rebuild_counters
+from .models import Post, Comment, Like
+
+User = get_user_model()
+
+# Bulk factories for tests and benchmarks: every function issues one INSERT
+# per call (per tree level for comments), whatever the row count. Counters are
+# not maintained by bulk_create; seed_blog() rebuilds them at the end.
+
+
+def make_members(count, password=None, first_id=800000):
+    """Members with studentIds from first_id; unusable passwords unless one is given (hashed once, shared)."""
+    encoded = make_password(password)
+    return User.objects.bulk_create([
+        User(
+            studentId=first_id + i, name=f'Member {i}', role='member',
+            email=f'member{first_id + i}@example.com', password=encoded,
+        )
+        for i in range(count)
+    ])
+
+
+def make_posts(authors, count):
+    return Post.objects.bulk_create([
+        Post(title=f'Post {i}', content=f'Body of post {i} ' * 20, author=authors[i % len(authors)]) for i in range(count)
+    ])
+
+
+def make_threads(posts, authors, threads_per_post, depth=2):
+    """threads_per_post top-level comments per post, each the head of a reply chain depth comments long."""
+    level = Comment.objects.bulk_create([
+        Comment(post=post, author=authors[(post.id + i) % len(authors)], content=f'Comment {i}')
+        for post in posts for i in range(threads_per_post)
+    ])
+    comments = list(level)
+    for _ in range(depth - 1):
+        level = Comment.objects.bulk_create([
+            Comment(
+                post_id=parent.post_id, parent_comment=parent, author=authors[parent.id % len(authors)], content='Reply',
+                path=parent.subtree_prefix, depth=parent.depth + 1,
+            )
+            for parent in level
+        ])
+        comments += level
+    return comments
+
+
+def make_post_likes(posts, members, per_post):
+    per_post = min(per_post, len(members))
+    return Like.objects.bulk_create([
+        Like(post=post, user=members[(post.id + i) % len(members)]) for post in posts for i in range(per_post)
+    ])
+
+
+def make_comment_likes(comments, members, per_comment):
+    per_comment = min(per_comment, len(members))
+    return Like.objects.bulk_create([
+        Like(comment=comment, user=members[(comment.id + i) % len(members)]) for comment in comments for i in range(per_comment)
+    ])
+
+
+def seed_blog(users=50, posts=200, comments_per_post=20, likes_per_post=10, depth=2, comment_likes=0, password=None):
+    """
+    Bulk-create members, posts, comment threads and likes; returns the post ids.
+
+    Each post gets comments_per_post comments as reply chains depth long
+    (depth=2: half top-level comments, each with one reply).
+    """
+    members = make_members(users, password)
+    created = make_posts(members, posts)
+    comments = make_threads(created, members, comments_per_post // depth, depth)
+    make_post_likes(created, members, likes_per_post)
+    if comment_likes:
+        make_comment_likes(comments, members, comment_likes)
+    rebuild_counters()
+    return [post.id for post in created]
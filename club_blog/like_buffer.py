@@ -0,0 +1,281 @@
+import atexit
+import json
+import logging
+import os
+import re
+import secrets
+import threading
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+
+from .cache import invalidate_comments, invalidate_posts
+from .counters import rebuild_counters
+from .models import Post, Comment, Like
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+TARGETS = {'post': Post, 'comment': Comment}
+INSERT_BATCH_SIZE = 1000
+DELETE_BATCH_SIZE = 200
+# likes-<pid>-<start token>.log, and .log.flushing while a flush applies it
+JOURNAL_RE = re.compile(r'^likes-(\d+)(?:-(\w+))?\.log(\.flushing)?$')
+
+
+def _kind(model):
+    return 'post' if model is Post else 'comment'
+
+
+def _effect(stored, liked):
+    # Change to like_count once an intent lands on the assumed stored state
+    return int(liked) - int(stored)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class LikeBuffer:
+    """
+    Write-behind queue for like/unlike intents.
+
+    Intents are coalesced per (user, target) so only the last one counts, and
+    a daemon thread applies them every flush_interval seconds with one
+    bulk INSERT (conflicts ignored) and batched DELETEs, then recounts the
+    touched targets. Pending intents are flushed on interpreter exit.
+
+    With a journal_dir, every intent is also appended to a per-process log
+    that is rotated on each flush; logs left behind by a dead process are
+    replayed on startup, so a crash loses at most what the OS had not yet
+    written out. Log names carry a token per process start besides the pid,
+    as a restarted container hands out the same pids again.
+    """
+
+    def __init__(self, flush_interval=1.0, journal_dir=None, max_pending=5000):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}  # (user_id, kind, pk) -> (assumed stored state, liked)
+        self._deltas = {}  # (kind, pk) -> like_count change not yet in the database
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._journal = None
+        self._journal_path = None
+        if journal_dir:
+            os.makedirs(journal_dir, exist_ok=True)
+            self._journal_token = secrets.token_hex(4)
+            self._journal_path = os.path.join(journal_dir, f'likes-{os.getpid()}-{self._journal_token}.log')
+            self._journal = open(self._journal_path, 'a', encoding='utf-8')
+            self._recover(journal_dir)
+
+    # Public API
+
+    def add(self, user_id, model, pk):
+        return self._record(user_id, model, pk, True)
+
+    def remove(self, user_id, model, pk):
+        return self._record(user_id, model, pk, False)
+
+    def pending(self, user_id, kind, pks):
+        """{pk: liked} for the user's queued intents on these targets ('post' or 'comment')."""
+        with self._lock:
+            return {pk: intent[1] for pk in pks if (intent := self._pending.get((user_id, kind, pk)))}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='like-buffer-flusher', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+        if self._journal is not None:
+            self._journal.close()
+            if os.path.exists(self._journal_path) and not os.path.getsize(self._journal_path):
+                os.remove(self._journal_path)
+            self._journal = None
+
+    def flush(self):
+        """Apply every pending intent to the database; returns how many were applied."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, {}
+                flushing = self._rotate_journal()
+
+            try:
+                self._apply(batch)
+            except Exception:
+                logger.exception("Failed to flush %d buffered likes; will retry", len(batch))
+                with self._lock:
+                    for key, intent in batch.items():
+                        if key in self._pending:
+                            self._shift_delta(key, -_effect(*intent))  # Superseded by a newer intent
+                        else:
+                            self._pending[key] = intent
+                            self._log(key, intent[1])
+                self._discard(flushing)
+                return 0
+
+            with self._lock:
+                for key, intent in batch.items():
+                    self._shift_delta(key, -_effect(*intent))
+            self._discard(flushing)
+            return len(batch)
+
+    # Internals
+
+    def _record(self, user_id, model, pk, liked):
+        """Queue an intent and return (None, optimistic like_count)."""
+        count = model.objects.filter(pk=pk).values_list('like_count', flat=True).first()
+        if count is None:
+            raise model.DoesNotExist
+
+        key = (user_id, _kind(model), pk)
+        with self._lock:
+            self._queue(key, liked)
+            count = max(count + self._deltas.get(key[1:], 0), 0)
+            if len(self._pending) >= self.max_pending:
+                self._wake.set()
+        return None, count
+
+    def _queue(self, key, liked):
+        # The first intent on a key assumes the stored state is its opposite
+        previous = self._pending.get(key)
+        stored = previous[0] if previous else not liked
+        if previous:
+            self._shift_delta(key, -_effect(*previous))
+        self._pending[key] = (stored, liked)
+        self._shift_delta(key, _effect(stored, liked))
+        self._log(key, liked)
+
+    def _shift_delta(self, key, delta):
+        target = key[1:]
+        value = self._deltas.get(target, 0) + delta
+        if value:
+            self._deltas[target] = value
+        else:
+            self._deltas.pop(target, None)
+
+    def _apply(self, batch):
+        likes = {kind: [] for kind in TARGETS}
+        unlikes = {kind: [] for kind in TARGETS}
+        touched = {kind: set() for kind in TARGETS}
+        for (user_id, kind, pk), (_, liked) in batch.items():
+            (likes if liked else unlikes)[kind].append((user_id, pk))
+            touched[kind].add(pk)
+
+        with transaction.atomic():
+            # Skip intents whose user or target was deleted since they were queued
+            users = set(User.objects.filter(pk__in={key[0] for key in batch}).values_list('pk', flat=True))
+            for kind, model in TARGETS.items():
+                existing = set(model.objects.filter(pk__in=touched[kind]).values_list('pk', flat=True))
+                touched[kind] = existing
+                Like.objects.bulk_create(
+                    [Like(user_id=user_id, **{f'{kind}_id': pk}) for user_id, pk in likes[kind] if user_id in users and pk in existing],
+                    ignore_conflicts=True,
+                    batch_size=INSERT_BATCH_SIZE,
+                )
+                pairs = unlikes[kind]
+                for start in range(0, len(pairs), DELETE_BATCH_SIZE):
+                    chunk = pairs[start:start + DELETE_BATCH_SIZE]
+                    pairs_match = reduce(or_, (Q(user_id=user_id, **{f'{kind}_id': pk}) for user_id, pk in chunk))
+                    # The other target's IS NULL matches the partial unique index on (user, target)
+                    other = 'comment' if kind == 'post' else 'post'
+                    Like.objects.filter(pairs_match, **{f'{other}__isnull': True}).delete()
+            rebuild_counters(post_ids=touched['post'], comment_ids=touched['comment'])
+            invalidate_posts(touched['post'])
+            invalidate_comments(touched['comment'])
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            close_old_connections()
+            self.flush()
+        connection.close()
+
+    def _log(self, key, liked):
+        if self._journal is not None:
+            self._journal.write(json.dumps([*key, liked]) + '\n')
+            self._journal.flush()
+
+    def _rotate_journal(self):
+        if self._journal is None:
+            return None
+        self._journal.close()
+        flushing = f'{self._journal_path}.flushing'
+        os.replace(self._journal_path, flushing)
+        self._journal = open(self._journal_path, 'a', encoding='utf-8')
+        return flushing
+
+    def _discard(self, path):
+        if path is not None and os.path.exists(path):
+            os.remove(path)
+
+    def _recover(self, journal_dir):
+        # Replayed intents are logged to this process's journal before the old log is removed
+        journals = []
+        for name in os.listdir(journal_dir):
+            match = JOURNAL_RE.match(name)
+            if match is None:
+                continue
+            pid, token, flushing = int(match[1]), match[2], bool(match[3])
+            if pid == os.getpid() and token == self._journal_token:
+                continue  # This process's own journal
+            if pid != os.getpid() and _pid_alive(pid):
+                continue  # Still being written; with our pid but another token it is an earlier process's
+            # Oldest first: a process's .flushing batch predates its .log
+            journals.append((pid, token or '', not flushing, name))
+        for *_, name in sorted(journals):
+            path = os.path.join(journal_dir, name)
+            with open(path, encoding='utf-8') as journal:
+                for line in journal:
+                    try:
+                        user_id, kind, pk, liked = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line of a crashed writer
+                    self._queue((user_id, kind, pk), liked)
+            os.remove(path)
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_like_buffer():
+    """Return the process-wide like buffer, or None when buffering is disabled."""
+    global _buffer
+    config = settings.BLOG_LIKE_BUFFER
+    if not config['ENABLED']:
+        return None
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                buffer = LikeBuffer(
+                    flush_interval=config['FLUSH_INTERVAL'],
+                    journal_dir=config['JOURNAL_DIR'],
+                    max_pending=config['MAX_PENDING'],
+                )
+                buffer.start()
+                _buffer = buffer
+    return _buffer
@@ -0,0 +1,158 @@
+from django.db import IntegrityError, transaction
+
+from .cache import derive_etag, invalidate_comments, invalidate_posts
+from .counters import adjust_like_count
+from .like_buffer import get_like_buffer
+from .models import Post, Like
+
+
+def _target(model, pk):
+    return {'post_id': pk} if model is Post else {'comment_id': pk}
+
+
+def like_lookup(model, pk):
+    """Filter kwargs for the likes of one post or comment."""
+    # Naming the other target as NULL lets the planner use the partial unique
+    # index on (user, target); without it SQLite falls back to the user_id index
+    if model is Post:
+        return {'post_id': pk, 'comment__isnull': True}
+    return {'comment_id': pk, 'post__isnull': True}
+
+
+def _like_count(model, pk):
+    count = model.objects.filter(pk=pk).values_list('like_count', flat=True).first()
+    if count is None:
+        raise model.DoesNotExist
+    return count
+
+
+def _invalidate(model, pk):
+    if model is Post:
+        invalidate_posts([pk])
+    else:
+        invalidate_comments([pk])
+
+
+def add_like(user_id, model, pk):
+    """
+    Like a post or comment; liking twice is a no-op.
+
+    The happy path is one INSERT plus one counter UPDATE. Duplicates are
+    rejected by the partial unique constraints rather than a prior SELECT, so
+    concurrent requests cannot both succeed. Returns (created, like_count) and
+    raises model.DoesNotExist for an unknown target.
+
+    When the like buffer is enabled the intent is queued instead and created
+    is None; like_count is then the optimistic count.
+    """
+    buffer = get_like_buffer()
+    if buffer is not None:
+        return buffer.add(user_id, model, pk)
+
+    try:
+        with transaction.atomic():
+            Like.objects.create(user_id=user_id, **_target(model, pk))
+            count = adjust_like_count(model, pk, 1)
+            if count is None:
+                raise model.DoesNotExist  # Roll back the insert (SQLite defers the FK check)
+            _invalidate(model, pk)
+        return True, count
+    except IntegrityError:
+        return False, _like_count(model, pk)
+
+
+def remove_like(user_id, model, pk):
+    """
+    Unlike a post or comment; unliking twice is a no-op.
+
+    Like has no delete receivers, so the queryset delete is a single DELETE.
+    Returns (deleted, like_count) and raises model.DoesNotExist for an
+    unknown target. Buffered like add_like, with deleted set to None.
+    """
+    buffer = get_like_buffer()
+    if buffer is not None:
+        return buffer.remove(user_id, model, pk)
+
+    with transaction.atomic():
+        deleted, _ = Like.objects.filter(user_id=user_id, **like_lookup(model, pk)).delete()
+        if not deleted:
+            return False, _like_count(model, pk)
+        count = adjust_like_count(model, pk, -deleted)
+        _invalidate(model, pk)
+    return True, count
+
+
+# liked_by_me flags. Cached payloads are shared by every viewer and carry
+# liked_by_me=False; the requesting member's likes are overlaid per response.
+
+def liked_targets(data):
+    """The post and comment dicts of a feed, details, comment page or search payload."""
+    posts, comments = [], []
+
+    def visit(items):
+        for item in items:
+            if 'post' in item:  # Only comment rows carry their post id
+                comments.append(item)
+                visit(item.get('replies', ()))
+            else:
+                posts.append(item)
+
+    if 'results' in data:
+        visit(data['results'])
+    else:
+        posts.append(data)
+        visit(data.get('comments', ()))
+    return posts, comments
+
+
+def liked_query(user_id, post_ids, comment_ids):
+    """(post_id, comment_id) of the user's likes among the given targets, in one statement."""
+    # A UNION ALL rather than an OR: each half is then a lookup on its partial
+    # unique index instead of a scan of all the user's likes
+    liked_posts = Like.objects.filter(user_id=user_id, post_id__in=post_ids, comment__isnull=True)
+    liked_comments = Like.objects.filter(user_id=user_id, comment_id__in=comment_ids, post__isnull=True)
+    return liked_posts.values_list('post_id', 'comment_id').union(liked_comments.values_list('post_id', 'comment_id'), all=True)
+
+
+def _mark_liked(user_id, etag, posts, comments, rows):
+    liked = {'post': set(), 'comment': set()}
+    for post_id, comment_id in rows:
+        liked['post' if post_id else 'comment'].add(post_id or comment_id)
+    targets = {'post': posts, 'comment': comments}
+
+    # Intents still queued in this process's like buffer count as done, so a
+    # member sees their own like straight away
+    buffer = get_like_buffer()
+    if buffer is not None:
+        for kind, items in targets.items():
+            for pk, state in buffer.pending(user_id, kind, [item['id'] for item in items]).items():
+                (liked[kind].add if state else liked[kind].discard)(pk)
+
+    for kind, items in targets.items():
+        for item in items:
+            item['liked_by_me'] = item['id'] in liked[kind]
+    # Viewers who like the same targets get the same body, hence the same etag
+    return derive_etag(etag, sorted(liked['post']), sorted(liked['comment']))
+
+
+def with_liked_by_me(user_id, etag, data):
+    """
+    Overlay the viewer's liked_by_me flags on a payload with one Like query; returns (etag, data).
+
+    data is modified in place: get_or_build() hands out a copy of the cached
+    entry. Anonymous viewers (user_id None) get the payload as it is.
+    """
+    if user_id is None:
+        return etag, data
+    posts, comments = liked_targets(data)
+    rows = liked_query(user_id, [post['id'] for post in posts], [comment['id'] for comment in comments])
+    return _mark_liked(user_id, etag, posts, comments, rows), data
+
+
+async def awith_liked_by_me(user_id, etag, data):
+    if user_id is None:
+        return etag, data
+    posts, comments = liked_targets(data)
+    query = liked_query(user_id, [post['id'] for post in posts], [comment['id'] for comment in comments])
+    rows = [row async for row in query]
+    return _mark_liked(user_id, etag, posts, comments, rows), data
@@ -0,0 +1,33 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections
+
+
+@contextmanager
+def scratch_sqlite(**overrides):
+    """
+    Point the default connection at a freshly migrated throwaway SQLite file.
+
+    overrides are applied on top of DATABASES['default'] (e.g. OPTIONS) and
+    everything is restored on exit, so benchmarks never touch the real data.
+    """
+    default = connections.settings['default']
+    if default['ENGINE'] != 'django.db.backends.sqlite3':
+        raise CommandError("This benchmark runs on a scratch SQLite file; DB_ENGINE must be sqlite.")
+
+    saved = dict(default)
+    with tempfile.TemporaryDirectory() as directory:
+        connection.close()
+        default.update(overrides, NAME=os.path.join(directory, 'bench.sqlite3'))
+        try:
+            call_command('migrate', verbosity=0)
+            yield
+        finally:
+            connection.close()
+            default.clear()
+            default.update(saved)
+
@@ -0,0 +1,130 @@
+import asyncio
+import io
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from club_blog.factories import seed_blog
+
+from ._scratch import scratch_sqlite
+
+HOST = 'testserver'
+
+
+def wsgi_get(handler, path):
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SERVER_NAME': HOST, 'SERVER_PORT': '80',
+        'HTTP_HOST': HOST, 'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http', 'wsgi.errors': io.StringIO(),
+    }
+    statuses = []
+    body = b''.join(handler(environ, lambda status, headers: statuses.append(status)))
+    return int(statuses[0].split()[0]), body
+
+
+async def asgi_get(handler, path):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [(b'host', HOST.encode())], 'client': ('127.0.0.1', 50000), 'server': (HOST, 80),
+    }
+    sent = False
+    disconnected = asyncio.Event()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await disconnected.wait()  # Client stays connected until the response is sent
+        return {'type': 'http.disconnect'}
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    await handler(scope, receive, send)
+    disconnected.set()
+    return messages[0]['status'], b''.join(m.get('body', b'') for m in messages[1:])
+
+
+class Command(BaseCommand):
+    help = "Compare requests/sec and p99 latency of the blog read endpoints under WSGI and ASGI."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument('--cached', action='store_true', help="Leave the response cache on")
+
+    def handle(self, *args, **options):
+        cache_settings = None if options['cached'] else {'ALIAS': 'blog', 'TIMEOUT': 0, 'FEED_TIMEOUT': 0}
+        overrides = {'DEBUG': False, 'ALLOWED_HOSTS': [HOST]}
+        if cache_settings:
+            overrides['BLOG_CACHE'] = cache_settings
+
+        with scratch_sqlite(), override_settings(**overrides):
+            post_ids = seed_blog()
+            rng = random.Random(0)
+            paths = {
+                'sync': lambda: rng.choice(['/blog/posts/', f'/blog/post/{rng.choice(post_ids)}/details/']),
+                'async': lambda: rng.choice(['/blog/async/posts/', f'/blog/async/post/{rng.choice(post_ids)}/details/']),
+            }
+            concurrency, seconds = options['concurrency'], options['seconds']
+            self.report('WSGI, sync views', *self.run_wsgi(paths['sync'], concurrency, seconds))
+            self.report('ASGI, sync views', *self.run_asgi(paths['sync'], concurrency, seconds))
+            self.report('ASGI, async views', *self.run_asgi(paths['async'], concurrency, seconds))
+
+    def run_wsgi(self, next_path, concurrency, seconds):
+        handler = WSGIHandler()
+        latencies, errors = [], []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+
+        def worker():
+            local, failed = [], 0
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                status, _ = wsgi_get(handler, next_path())
+                local.append(time.perf_counter() - started)
+                failed += status >= 400
+            with lock:
+                latencies.extend(local)
+                errors.append(failed)
+
+        with ThreadPoolExecutor(concurrency) as pool:
+            for _ in range(concurrency):
+                pool.submit(worker)
+        return latencies, sum(errors), seconds
+
+    def run_asgi(self, next_path, concurrency, seconds):
+        handler = ASGIHandler()
+        latencies, errors = [], 0
+
+        async def worker(deadline):
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                status, _ = await asgi_get(handler, next_path())
+                latencies.append(time.perf_counter() - started)
+                errors += status >= 400
+
+        async def main():
+            deadline = time.perf_counter() + seconds
+            await asyncio.gather(*(worker(deadline) for _ in range(concurrency)))
+
+        asyncio.run(main())
+        return latencies, errors, seconds
+
+    def report(self, label, latencies, errors, seconds):
+        quantiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{label:>18}: {len(latencies) / seconds:8.1f} req/s  "
+            f"p50 {quantiles[49] * 1000:6.1f} ms  p99 {quantiles[98] * 1000:7.1f} ms  errors: {errors}"
+        )
@@ -0,0 +1,158 @@
+import itertools
+import json
+import re
+import statistics
+import time
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from club_auth.authentication import ClubRefreshToken, user_cache
+from club_blog.factories import make_members, make_posts, make_threads, seed_blog
+from club_blog.likes import add_like, remove_like
+from club_blog.models import Comment, Post
+from cseClub.instrumentation import OPTIONS as INSTRUMENTATION_OPTIONS
+
+from ._scratch import scratch_sqlite
+
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+PASSWORD = 'bench-password'
+
+
+class Command(BaseCommand):
+    help = (
+        "Time every blog and auth endpoint on seeded databases of increasing size "
+        "and optionally save or compare the results as a JSON baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000], help="Posts to seed (10 comments and 10 likes each)")
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--cached', action='store_true', help="Leave the response cache on")
+        parser.add_argument('--output', help="Write the results to this JSON file")
+        parser.add_argument('--baseline', help="Compare against a JSON file written by --output")
+
+    def handle(self, *args, **options):
+        overrides = {'DEBUG': False, 'ALLOWED_HOSTS': ['testserver']}
+        if not options['cached']:
+            overrides['BLOG_CACHE'] = {'ALIAS': 'blog', 'TIMEOUT': 0, 'FEED_TIMEOUT': 0}
+
+        results = {}
+        for size in options['sizes']:
+            # Query counts are read from the Server-Timing header
+            with scratch_sqlite(), override_settings(**overrides), mock.patch.dict(INSTRUMENTATION_OPTIONS, SERVER_TIMING=True):
+                caches['blog'].clear()
+                user_cache.clear()
+                started = time.perf_counter()
+                seed_blog(users=max(20, size // 10), posts=size, comments_per_post=10, likes_per_post=10, password=PASSWORD)
+                self.stdout.write(f"Seeded {size} posts in {time.perf_counter() - started:.1f}s")
+                results[str(size)] = self.run_endpoints(options['repeat'])
+
+        self.report(results, options['sizes'])
+        if options['baseline']:
+            with open(options['baseline']) as source:
+                self.compare(results, json.load(source))
+        if options['output']:
+            with open(options['output'], 'w') as target:
+                json.dump(results, target, indent=2)
+
+    def run_endpoints(self, repeat):
+        client = Client()
+        member = make_members(1, PASSWORD, first_id=900000)[0]
+        post_id = Post.objects.order_by('-id').values_list('id', flat=True)[0]
+        comment_id = Comment.objects.filter(post_id=post_id, parent_comment=None).values_list('id', flat=True)[0]
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {ClubRefreshToken.for_user(member).access_token}'}
+        new_ids = itertools.count(950000)
+
+        def fresh_post():
+            [post] = make_posts([member], 1)
+            make_threads([post], [member], 5)
+            return post.pk
+
+        def fresh_comment():
+            return Comment.objects.create(post_id=post_id, author=member, content='Temporary').pk
+
+        def with_like(model, pk, liked):
+            # Time the insert and delete paths, not the idempotent no-ops
+            (add_like if liked else remove_like)(member.id, model, pk)
+            return pk
+
+        # name -> () -> (method, path, data, extra); the callable runs outside the timed section
+        endpoints = {
+            'list_posts': lambda: ('get', reverse('list_posts'), {}, {}),
+            'list_posts_async': lambda: ('get', reverse('list_posts_async'), {}, {}),
+            'post_details': lambda: ('get', reverse('post_details', args=[post_id]), {}, {}),
+            'post_details_async': lambda: ('get', reverse('post_details_async', args=[post_id]), {}, {}),
+            'post_comments': lambda: ('get', reverse('post_comments', args=[post_id]), {}, {}),
+            'comment_replies': lambda: ('get', reverse('comment_replies', args=[comment_id]), {}, {}),
+            'search': lambda: ('get', reverse('search'), {'q': 'body post'}, {}),
+            'create_post': lambda: ('post', reverse('create_post'), {'title': 'Bench', 'content': 'Text'}, auth),
+            'update_post': lambda: ('put', reverse('update-post', args=[post_id]), {'title': 'Bench', 'content': 'Text'}, auth),
+            'delete_post': lambda: ('delete', reverse('delete-post', args=[fresh_post()]), {}, auth),
+            'create_comment': lambda: ('post', reverse('create_comment', args=[post_id]), {'content': 'Bench'}, auth),
+            'reply_to_comment': lambda: ('post', reverse('reply_to_comment', args=[comment_id]), {'content': 'Bench'}, auth),
+            'update_comment': lambda: ('put', reverse('update-comment', args=[comment_id]), {'content': 'Bench'}, auth),
+            'delete_comment': lambda: ('delete', reverse('delete-comment', args=[fresh_comment()]), {}, auth),
+            'like_post': lambda: ('post', reverse('like_post', args=[with_like(Post, post_id, False)]), {}, auth),
+            'unlike_post': lambda: ('delete', reverse('unlike_post', args=[with_like(Post, post_id, True)]), {}, auth),
+            'like_comment': lambda: ('post', reverse('like_comment', args=[with_like(Comment, comment_id, False)]), {}, auth),
+            'unlike_comment': lambda: ('delete', reverse('unlike_comment', args=[with_like(Comment, comment_id, True)]), {}, auth),
+            'register': lambda: ('post', reverse('register'), {
+                'studentId': (student_id := next(new_ids)), 'name': 'Bench', 'email': f'{student_id}@example.com', 'password': PASSWORD,
+            }, {}),
+            'login': lambda: ('post', reverse('login'), {'studentId': member.studentId, 'password': PASSWORD}, {}),
+            'logout': lambda: ('post', reverse('logout'), {'refresh_token': str(ClubRefreshToken.for_user(member))}, auth),
+            'check': lambda: ('get', '/auth/check/', {}, auth),
+            'check_async': lambda: ('get', reverse('check_async'), {}, auth),
+            'token_obtain_pair': lambda: ('post', reverse('token_obtain_pair'), {'studentId': member.studentId, 'password': PASSWORD}, {}),
+            'token_refresh': lambda: ('post', reverse('token_refresh'), {'refresh': str(ClubRefreshToken.for_user(member))}, {}),
+        }
+
+        results = {}
+        for name, build in endpoints.items():
+            timings, queries = [], []
+            for _ in range(repeat):
+                method, path, data, extra = build()
+                if method in ('put', 'delete'):
+                    data, extra = json.dumps(data), dict(extra, content_type='application/json')
+                started = time.perf_counter()
+                response = getattr(client, method)(path, data, **extra)
+                timings.append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    self.stderr.write(f"{name}: {response.status_code} {response.content[:200]!r}")
+                    break
+                match = QUERIES_RE.search(response.get('Server-Timing', ''))
+                if match:
+                    queries.append(int(match.group(1)))
+            results[name] = {
+                'median_ms': round(statistics.median(timings) * 1000, 3),
+                'p95_ms': round(sorted(timings)[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 3),
+                'queries': max(queries) if queries else None,
+            }
+        return results
+
+    def report(self, results, sizes):
+        columns = [str(size) for size in sizes]
+        self.stdout.write(f"\n{'median ms (queries)':<22}" + ''.join(f"{size + ' posts':>18}" for size in columns))
+        for name in results[columns[0]]:
+            cells = []
+            for size in columns:
+                result = results[size][name]
+                cells.append(f"{result['median_ms']:>10.2f} ({result['queries'] if result['queries'] is not None else '?':>3})")
+            self.stdout.write(f"{name:<22}" + ''.join(f"{cell:>18}" for cell in cells))
+
+    def compare(self, results, baseline):
+        self.stdout.write("\nChange against the baseline (median):")
+        for size, endpoints in results.items():
+            for name, result in endpoints.items():
+                previous = baseline.get(size, {}).get(name)
+                if not previous:
+                    continue
+                ratio = result['median_ms'] / previous['median_ms'] if previous['median_ms'] else 0
+                flag = '  <-- slower' if ratio > 1.25 else ''
+                queries = '' if result['queries'] == previous['queries'] else f", queries {previous['queries']} -> {result['queries']}"
+                self.stdout.write(f"{size:>6} {name:<22}{ratio:>6.2f}x{queries}{flag}")
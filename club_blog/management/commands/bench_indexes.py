@@ -0,0 +1,80 @@
+import statistics
+import time
+from datetime import datetime, timezone
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from club_blog.factories import seed_blog
+from club_blog.likes import like_lookup, liked_query
+from club_blog.models import Comment, Like, Post
+from club_blog.pagination import encode_cursor, keyset_page_query
+from club_blog.serializers import COMMENT_VALUES, POST_VALUES
+
+from ._scratch import scratch_sqlite
+
+# The last migration before the access path indexes
+WITHOUT_INDEXES = '0005_search_index'
+
+
+def hot_queries(post_id, comment_id, user_id, post_ids, page_size=20):
+    """The blog's hottest queries as the views run them, keyed by a short name."""
+    cursor = encode_cursor(datetime.now(timezone.utc), 2**31)
+    return {
+        'feed': keyset_page_query(Post.objects.values(*POST_VALUES), None, page_size),
+        'feed_after_cursor': keyset_page_query(Post.objects.values(*POST_VALUES), cursor, page_size),
+        'comment_tree': Comment.objects.filter(post_id=post_id).order_by('created_at', 'id').values(*COMMENT_VALUES),
+        'top_level_comments': keyset_page_query(
+            Comment.objects.filter(post_id=post_id, parent_comment__isnull=True).values(*COMMENT_VALUES), None, page_size, descending=False,
+        ),
+        'replies': keyset_page_query(
+            Comment.objects.filter(parent_comment_id=comment_id).values(*COMMENT_VALUES), None, page_size, descending=False,
+        ),
+        'post_like': Like.objects.filter(user_id=user_id, **like_lookup(Post, post_id)),
+        'comment_like': Like.objects.filter(user_id=user_id, **like_lookup(Comment, comment_id)),
+        'liked_posts': Like.objects.filter(user_id=user_id, post_id__in=post_ids, comment__isnull=True).values_list('post_id', flat=True),
+        'liked_by_me': liked_query(user_id, post_ids, [comment_id]),
+    }
+
+
+class Command(BaseCommand):
+    help = "Time the hot blog queries with and without the access path indexes and show their plans."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--likes-per-post', type=int, default=100, help="100 with 1000 posts: 100k post likes")
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--plans', action='store_true', help="Print EXPLAIN QUERY PLAN for both runs")
+
+    def handle(self, *args, **options):
+        with scratch_sqlite():
+            post_ids = seed_blog(
+                users=max(200, options['likes_per_post']), posts=options['posts'], comments_per_post=20,
+                likes_per_post=options['likes_per_post'], comment_likes=2,
+            )
+            self.stdout.write(f"{Like.objects.count()} likes, {Comment.objects.count()} comments, {len(post_ids)} posts")
+            post_id = post_ids[len(post_ids) // 2]
+            comment_id = Comment.objects.filter(post_id=post_id, parent_comment=None).values_list('id', flat=True)[0]
+            user_id = Like.objects.filter(post_id=post_id).values_list('user_id', flat=True)[0]
+            arguments = (post_id, comment_id, user_id, post_ids[:20])
+
+            after = self.measure(hot_queries(*arguments), options)
+            call_command('migrate', 'club_blog', WITHOUT_INDEXES, verbosity=0)
+            before = self.measure(hot_queries(*arguments), options)
+
+        self.stdout.write(f"\n{'median ms':<22}{'before':>10}{'after':>10}")
+        for name in after:
+            self.stdout.write(f"{name:<22}{before[name]:>10.3f}{after[name]:>10.3f}")
+
+    def measure(self, queries, options):
+        results = {}
+        for name, queryset in queries.items():
+            if options['plans']:
+                self.stdout.write(f"{name}:\n  " + queryset.explain().replace('\n', '\n  '))
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append(time.perf_counter() - started)
+            results[name] = statistics.median(timings) * 1000
+        return results
@@ -0,0 +1,83 @@
+import statistics
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection, connections
+
+from club_blog.likes import add_like, remove_like
+from club_blog.models import Post
+
+from ._scratch import scratch_sqlite
+
+User = get_user_model()
+
+# What DATABASES['default'] looked like before it was read from the environment
+BASELINE = {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'OPTIONS': {}}
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer like/unlike on one post from concurrent threads against a scratch SQLite file, "
+        "once with the untuned baseline and once with the configured database settings."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--seconds', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        default = connections.settings['default']
+        configured = {key: default[key] for key in BASELINE}
+        for label, overrides in (('baseline', BASELINE), ('configured', configured)):
+            with scratch_sqlite(**overrides):
+                self.report(label, *self.run(options['threads'], options['seconds']))
+
+    def run(self, thread_count, seconds):
+        users = User.objects.bulk_create([
+            User(studentId=900000 + i, email=f'bench{i}@example.com', password='!') for i in range(thread_count)
+        ])
+        post = Post.objects.create(title='Bench', content='Bench', author=users[0])
+
+        latencies, errors = [], []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+        barrier = threading.Barrier(thread_count)
+
+        def worker(user):
+            local_latencies, local_errors = [], 0
+            barrier.wait()
+            while time.perf_counter() < deadline:
+                for action in (add_like, remove_like):
+                    started = time.perf_counter()
+                    try:
+                        action(user.id, Post, post.id)
+                    except OperationalError:
+                        local_errors += 1
+                    else:
+                        local_latencies.append(time.perf_counter() - started)
+                    # Mirrors request_finished: honours CONN_MAX_AGE
+                    close_old_connections()
+            connection.close()
+            with lock:
+                latencies.extend(local_latencies)
+                errors.append(local_errors)
+
+        threads = [threading.Thread(target=worker, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, sum(errors), seconds
+
+    def report(self, label, latencies, errors, seconds):
+        if not latencies:
+            self.stdout.write(f"{label:>10}: no successful writes, {errors} locked errors")
+            return
+        quantiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{label:>10}: {len(latencies) / seconds:8.1f} writes/s  "
+            f"p50 {quantiles[49] * 1000:6.1f} ms  p99 {quantiles[98] * 1000:7.1f} ms  "
+            f"'database is locked' errors: {errors}"
+        )
@@ -0,0 +1,60 @@
+import gzip
+import json
+import statistics
+import time
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+
+from club_blog.factories import seed_blog
+from cseClub.compression import brotli
+from cseClub.renderers import FastJSONRenderer, orjson
+
+from ._scratch import scratch_sqlite
+from .bench_asgi import HOST, wsgi_get
+
+
+def median_ms(render, data, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render(data)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+class Command(BaseCommand):
+    help = "Compare JSON rendering time and compressed sizes for a post with many comments."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--comments', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with scratch_sqlite(), override_settings(DEBUG=False, ALLOWED_HOSTS=[HOST]):
+            # Half top-level comments, each with one reply (see seed_blog)
+            [post_id] = seed_blog(posts=1, comments_per_post=options['comments'])
+            status, body = wsgi_get(WSGIHandler(), f'/blog/post/{post_id}/details/')
+            if status != 200:
+                self.stderr.write(f"details returned {status}")
+                return
+        data = json.loads(body)
+
+        stdlib, fast = JSONRenderer(), FastJSONRenderer()
+        if stdlib.render(data) != fast.render(data):
+            self.stderr.write("Renderers disagree on the output bytes")
+        rendered = fast.render(data)
+
+        self.stdout.write(f"{len(data['comments'])} top-level comments")
+        self.stdout.write(f"{'JSONRenderer':<24}{median_ms(stdlib.render, data, options['repeat']):>8.2f} ms")
+        label = 'FastJSONRenderer' + ('' if orjson else ' (no orjson)')
+        self.stdout.write(f"{label:<24}{median_ms(fast.render, data, options['repeat']):>8.2f} ms")
+
+        self.stdout.write(f"{'identity':<24}{len(rendered):>8} bytes")
+        self.stdout.write(f"{'gzip':<24}{len(gzip.compress(rendered, 6)):>8} bytes")
+        if brotli is not None:
+            self.stdout.write(f"{'br (quality 5)':<24}{len(brotli.compress(rendered, quality=5)):>8} bytes")
+        else:
+            self.stdout.write("br: brotli is not installed")
@@ -0,0 +1,53 @@
+import timeit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework import serializers
+
+from club_auth.serializers import UserSerializer
+from club_blog.models import Post
+from club_blog.serializers import serialize_post_row
+
+User = get_user_model()
+
+
+class FullAuthorPostSerializer(serializers.ModelSerializer):
+    # The embed the read paths used before: the whole UserSerializer per author
+    author = UserSerializer(read_only=True)
+    like_count = serializers.IntegerField(read_only=True)
+    comment_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Post
+        fields = ['id', 'title', 'content', 'author', 'created_at', 'like_count', 'comment_count']
+
+
+class Command(BaseCommand):
+    help = "Compare per-object cost of the full UserSerializer embed against the lean author summary."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--objects', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        count, repeat = options['objects'], options['repeat']
+        now = timezone.now()
+
+        # Unsaved instances and equivalent .values() rows; no database needed
+        posts, rows = [], []
+        for i in range(count):
+            author = User(id=i, studentId=i, name=f'Member {i}', role='member', email=f'm{i}@example.com', bio='Bio', avatar='avatars/avatar.jpeg')
+            posts.append(Post(id=i, title=f'Post {i}', content='Content', author=author, created_at=now, like_count=3, comment_count=2))
+            rows.append({
+                'id': i, 'title': f'Post {i}', 'content': 'Content', 'created_at': now, 'like_count': 3, 'comment_count': 2,
+                'author_id': i, 'author__name': f'Member {i}', 'author__role': 'member', 'author__avatar': 'avatars/avatar.jpeg', 'author__avatar_hash': '',
+            })
+
+        full = min(timeit.repeat(lambda: FullAuthorPostSerializer(posts, many=True).data, number=1, repeat=repeat))
+        tz = timezone.get_current_timezone()
+        lean = min(timeit.repeat(lambda: [serialize_post_row(row, tz) for row in rows], number=1, repeat=repeat))
+
+        self.stdout.write(f"UserSerializer embed: {full / count * 1e6:8.1f} us/object")
+        self.stdout.write(f"Author summary:       {lean / count * 1e6:8.1f} us/object")
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {full / lean:.1f}x"))
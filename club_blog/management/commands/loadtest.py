@@ -0,0 +1,268 @@
+import http.client
+import json
+import os
+import random
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from club_auth.authentication import ClubRefreshToken
+from club_blog.factories import seed_blog
+
+from ._scratch import scratch_sqlite
+
+User = get_user_model()
+
+PASSWORD = 'loadtest-password'
+DEFAULT_MIX = 'list_posts=45,post_details=35,like_post=10,create_comment=5,login=2,token_refresh=3'
+DEFAULT_SERVER = '{python} {manage} runserver {address} --noreload --skip-checks'
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in VirtualUser.actions:
+            raise CommandError(f"Unknown endpoint {name!r} in --mix; choose from {', '.join(VirtualUser.actions)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def free_port(host):
+    with socket.socket() as probe:
+        probe.bind((host, 0))
+        return probe.getsockname()[1]
+
+
+class VirtualUser:
+    """One member hitting the API back to back with their own JWTs; mirrors what the frontend sends."""
+
+    actions = ('list_posts', 'post_details', 'like_post', 'create_comment', 'login', 'token_refresh')
+
+    def __init__(self, host, port, timeout, student_id, refresh, post_ids, rng):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.student_id = student_id
+        self.refresh, self.access = str(refresh), str(refresh.access_token)
+        self.post_ids = post_ids
+        self.rng = rng
+        self.cursor = None
+
+    def request(self, method, path, body=None, authenticated=False):
+        # A connection per request: the dev server and gunicorn's sync workers do not keep connections alive
+        headers = {'Host': self.host, 'Connection': 'close'}
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        if authenticated:
+            headers['Authorization'] = f'Bearer {self.access}'
+        client = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            client.request(method, path, body, headers)
+            response = client.getresponse()
+            return response.status, response.read()
+        finally:
+            client.close()
+
+    def list_posts(self):
+        # Mostly the first page, sometimes the page after the last one seen
+        path = '/blog/posts/' if self.cursor is None or self.rng.random() < 0.7 else f'/blog/posts/?cursor={self.cursor}'
+        status, body = self.request('GET', path)
+        if status == 200:
+            self.cursor = json.loads(body).get('next_cursor')
+        return status
+
+    def post_details(self):
+        return self.request('GET', f'/blog/post/{self.rng.choice(self.post_ids)}/details/')[0]
+
+    def like_post(self):
+        return self.request('POST', f'/blog/post/{self.rng.choice(self.post_ids)}/like/', authenticated=True)[0]
+
+    def create_comment(self):
+        path = f'/blog/post/{self.rng.choice(self.post_ids)}/comment/'
+        return self.request('POST', path, {'content': 'Load test comment'}, authenticated=True)[0]
+
+    def login(self):
+        status, body = self.request('POST', '/auth/login/', {'studentId': self.student_id, 'password': PASSWORD})
+        if status == 200:
+            data = json.loads(body)
+            self.access, self.refresh = data['access_token'], data['refresh_token']
+        return status
+
+    def token_refresh(self):
+        status, body = self.request('POST', '/api/token/refresh/', {'refresh': self.refresh})
+        if status == 200:
+            data = json.loads(body)
+            self.access = data['access']
+            self.refresh = data.get('refresh', self.refresh)
+        return status
+
+
+class Command(BaseCommand):
+    help = (
+        "Boot the API against a seeded scratch SQLite database and drive a weighted mix of "
+        "endpoints from concurrent virtual users with real JWTs; reports throughput, latency "
+        "percentiles and errors per endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=20, help="Virtual users")
+        parser.add_argument('--duration', type=float, default=30.0, help="Seconds of measured traffic")
+        parser.add_argument('--warmup', type=float, default=3.0, help="Seconds of unmeasured traffic first")
+        parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Endpoint weights (default: {DEFAULT_MIX})")
+        parser.add_argument('--members', type=int, default=200)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments-per-post', type=int, default=20)
+        parser.add_argument('--likes-per-post', type=int, default=10)
+        parser.add_argument('--timeout', type=float, default=30.0, help="Per-request client timeout in seconds")
+        parser.add_argument(
+            '--server-command', default=DEFAULT_SERVER,
+            help="Command that serves the project; {python}, {manage}, {address}, {host} and {port} are filled in, "
+                 "e.g. 'gunicorn cseClub.wsgi -w 4 -b {address}'",
+        )
+        parser.add_argument('--seed', type=int, default=0, help="Random seed for the traffic")
+        parser.add_argument('--output', help="Write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options['mix'])
+        host = '127.0.0.1'
+        port = free_port(host)
+
+        with scratch_sqlite(), tempfile.TemporaryFile('w+') as server_log:
+            self.stdout.write(f"Seeding {options['posts']} posts and {options['members']} members...")
+            post_ids = seed_blog(
+                users=options['members'], posts=options['posts'], comments_per_post=options['comments_per_post'],
+                likes_per_post=options['likes_per_post'], password=PASSWORD,
+            )
+            members = list(User.objects.filter(studentId__gte=800000).order_by('studentId')[:options['concurrency']])
+            rng = random.Random(options['seed'])
+            users = [
+                VirtualUser(
+                    host, port, options['timeout'], member.studentId, ClubRefreshToken.for_user(member), post_ids,
+                    random.Random(rng.random()),
+                )
+                for member in (members[i % len(members)] for i in range(options['concurrency']))
+            ]
+            database = connection.settings_dict['NAME']
+            connection.close()  # The server process owns the database from here on
+
+            server = self.start_server(options['server_command'], host, port, database, server_log)
+            try:
+                results, seconds = self.drive(users, mix, options['warmup'], options['duration'])
+            finally:
+                server.terminate()
+                server.wait(10)
+            server_log.seek(0)
+            log = server_log.read()
+
+        summary = self.report(results, seconds, log)
+        if options['output']:
+            with open(options['output'], 'w') as target:
+                json.dump(summary, target, indent=2)
+
+    def start_server(self, template, host, port, database, log):
+        command = template.format(
+            python=sys.executable, manage=os.path.join(settings.BASE_DIR, 'manage.py'),
+            address=f'{host}:{port}', host=host, port=port,
+        )
+        env = dict(os.environ, DB_ENGINE='sqlite', DB_NAME=database, DEBUG='False', ALLOWED_HOSTS=host)
+        server = subprocess.Popen(shlex.split(command), cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                log.seek(0)
+                raise CommandError(f"The server exited with {server.returncode}:\n{log.read()[-2000:]}")
+            try:
+                socket.create_connection((host, port), timeout=1).close()
+                self.stdout.write(f"Serving on {host}:{port}: {command}")
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError("The server did not start listening within 30 seconds")
+
+    def drive(self, users, mix, warmup, duration):
+        names, weights = list(mix), list(mix.values())
+        results = defaultdict(list)  # endpoint -> [(seconds, outcome)]
+        lock = threading.Lock()
+        started = time.perf_counter()
+        measure_from = started + warmup
+        deadline = measure_from + duration
+
+        def run(user):
+            local = defaultdict(list)
+            while (now := time.perf_counter()) < deadline:
+                name = user.rng.choices(names, weights)[0]
+                try:
+                    outcome = getattr(user, name)()
+                except (OSError, http.client.HTTPException) as error:
+                    outcome = type(error).__name__
+                if now >= measure_from:
+                    local[name].append((time.perf_counter() - now, outcome))
+            with lock:
+                for name, samples in local.items():
+                    results[name].extend(samples)
+
+        threads = [threading.Thread(target=run, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, duration
+
+    def report(self, results, seconds, log):
+        summary = {'seconds': seconds, 'endpoints': {}}
+        everything = []
+        self.stdout.write(
+            f"\n{'endpoint':<16}{'requests':>9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}  outcomes"
+        )
+        for name in VirtualUser.actions:
+            samples = results.get(name)
+            if not samples:
+                continue
+            everything += samples
+            summary['endpoints'][name] = self.report_line(name, samples, seconds)
+
+        summary['total'] = self.report_line('total', everything, seconds)
+        locked = log.count('database is locked')
+        summary['server'] = {'database_is_locked': locked, 'tracebacks': log.count('Traceback (most recent call last)')}
+        self.stdout.write(
+            f"\nServer log: {locked} 'database is locked' errors, {summary['server']['tracebacks']} tracebacks"
+        )
+        return summary
+
+    def report_line(self, name, samples, seconds):
+        latencies = sorted(latency for latency, _ in samples)
+        outcomes = Counter(outcome for _, outcome in samples)
+        errors = sum(count for outcome, count in outcomes.items() if not isinstance(outcome, int) or outcome >= 400)
+        line = {
+            'requests': len(samples),
+            'throughput': len(samples) / seconds,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'error_rate': errors / len(samples) if samples else 0.0,
+            'outcomes': {str(outcome): count for outcome, count in sorted(outcomes.items(), key=str)},
+        }
+        self.stdout.write(
+            f"{name:<16}{line['requests']:>9}{line['throughput']:>9.1f}{line['p50_ms']:>9.1f}{line['p95_ms']:>9.1f}"
+            f"{line['p99_ms']:>9.1f}{line['error_rate']:>8.1%}  "
+            + ' '.join(f'{outcome}:{count}' for outcome, count in line['outcomes'].items())
+        )
+        return line
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from club_blog.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized like/comment/reply counters on posts and comments."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            posts, comments = rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt counters for {posts} posts and {comments} comments."))
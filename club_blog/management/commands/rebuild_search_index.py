@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from club_blog.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the post/comment full-text search index from the database."
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        with transaction.atomic():
+            posts, comments = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Reindexed {posts} posts and {comments} comments ({type(backend).__name__})."
+        ))
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:39
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Post = apps.get_model('club_blog', 'Post')
+    Comment = apps.get_model('club_blog', 'Comment')
+    Like = apps.get_model('club_blog', 'Like')
+
+    def count(model, field):
+        rows = model.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(n=Count('*'))
+        return Coalesce(Subquery(rows.values('n')), 0)
+
+    Post.objects.update(like_count=count(Like, 'post'), comment_count=count(Comment, 'post'))
+    Comment.objects.update(like_count=count(Like, 'comment'), reply_count=count(Comment, 'parent_comment'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('club_blog', '0002_alter_like_unique_together'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:40
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def drop_duplicate_likes(apps, schema_editor):
+    Post = apps.get_model('club_blog', 'Post')
+    Comment = apps.get_model('club_blog', 'Comment')
+    Like = apps.get_model('club_blog', 'Like')
+
+    # Rows the old NULL-blind unique_together let through
+    Like.objects.filter(post__isnull=True, comment__isnull=True).delete()
+    Like.objects.filter(post__isnull=False, comment__isnull=False).delete()
+    for target in ('post', 'comment'):
+        likes = Like.objects.filter(**{f'{target}__isnull': False})
+        keep = likes.values('user', target).annotate(first=Min('id')).values('first')
+        likes.exclude(id__in=keep).delete()
+
+    def count(field):
+        rows = Like.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(n=Count('*'))
+        return Coalesce(Subquery(rows.values('n')), 0)
+
+    Post.objects.update(like_count=count('post'))
+    Comment.objects.update(like_count=count('comment'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('club_blog', '0003_post_comment_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='like',
+            unique_together=set(),
+        ),
+        migrations.RunPython(drop_duplicate_likes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='like',
+            constraint=models.UniqueConstraint(condition=models.Q(('comment__isnull', True)), fields=('user', 'post'), name='unique_post_like'),
+        ),
+        migrations.AddConstraint(
+            model_name='like',
+            constraint=models.UniqueConstraint(condition=models.Q(('post__isnull', True)), fields=('user', 'comment'), name='unique_comment_like'),
+        ),
+        migrations.AddConstraint(
+            model_name='like',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('comment__isnull', True), ('post__isnull', False)), models.Q(('comment__isnull', False), ('post__isnull', True)), _connector='OR'), name='like_targets_post_or_comment'),
+        ),
+    ]
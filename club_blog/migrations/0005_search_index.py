@@ -0,0 +1,74 @@
+from django.db import migrations, OperationalError
+
+# FTS5 tables over the post/comment tables (external content), kept in sync by
+# triggers. Only the title/content columns fire the update triggers, so counter
+# updates never touch the index. Other backends use the in-process index in
+# club_blog.search.
+FTS_SQL = [
+    "CREATE VIRTUAL TABLE club_blog_post_fts USING fts5("
+    "title, content, content='club_blog_post', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE VIRTUAL TABLE club_blog_comment_fts USING fts5("
+    "content, content='club_blog_comment', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+
+    "CREATE TRIGGER club_blog_post_fts_ai AFTER INSERT ON club_blog_post BEGIN "
+    "INSERT INTO club_blog_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    "CREATE TRIGGER club_blog_post_fts_ad AFTER DELETE ON club_blog_post BEGIN "
+    "INSERT INTO club_blog_post_fts(club_blog_post_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END",
+    "CREATE TRIGGER club_blog_post_fts_au AFTER UPDATE OF title, content ON club_blog_post BEGIN "
+    "INSERT INTO club_blog_post_fts(club_blog_post_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+    "INSERT INTO club_blog_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+
+    "CREATE TRIGGER club_blog_comment_fts_ai AFTER INSERT ON club_blog_comment BEGIN "
+    "INSERT INTO club_blog_comment_fts(rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER club_blog_comment_fts_ad AFTER DELETE ON club_blog_comment BEGIN "
+    "INSERT INTO club_blog_comment_fts(club_blog_comment_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+    "CREATE TRIGGER club_blog_comment_fts_au AFTER UPDATE OF content ON club_blog_comment BEGIN "
+    "INSERT INTO club_blog_comment_fts(club_blog_comment_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+    "INSERT INTO club_blog_comment_fts(rowid, content) VALUES (new.id, new.content); END",
+
+    "INSERT INTO club_blog_post_fts(club_blog_post_fts) VALUES ('rebuild')",
+    "INSERT INTO club_blog_comment_fts(club_blog_comment_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS club_blog_post_fts_ai",
+    "DROP TRIGGER IF EXISTS club_blog_post_fts_ad",
+    "DROP TRIGGER IF EXISTS club_blog_post_fts_au",
+    "DROP TRIGGER IF EXISTS club_blog_comment_fts_ai",
+    "DROP TRIGGER IF EXISTS club_blog_comment_fts_ad",
+    "DROP TRIGGER IF EXISTS club_blog_comment_fts_au",
+    "DROP TABLE IF EXISTS club_blog_post_fts",
+    "DROP TABLE IF EXISTS club_blog_comment_fts",
+]
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+            cursor.execute("DROP TABLE temp.fts5_probe")
+        except OperationalError:
+            return  # SQLite built without FTS5; the in-process index takes over
+        for statement in FTS_SQL:
+            cursor.execute(statement)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in DROP_SQL:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('club_blog', '0004_like_partial_unique_constraints'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:19
+
+from importlib import import_module
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Copied from club_blog.models so later changes there cannot alter this backfill
+PATH_WIDTH = 8
+PATH_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BATCH_SIZE = 500
+
+
+def path_segment(pk):
+    digits = ''
+    while pk:
+        pk, digit = divmod(pk, 36)
+        digits = PATH_DIGITS[digit] + digits
+    return digits.rjust(PATH_WIDTH, '0')
+
+
+def backfill_paths(apps, schema_editor):
+    # Top-level comments keep the default empty path; then one tree level at a time
+    Comment = apps.get_model('club_blog', 'Comment')
+    parents = list(Comment.objects.filter(parent_comment=None).values_list('id', flat=True))
+    while parents:
+        children = []
+        for start in range(0, len(parents), BATCH_SIZE):
+            level = list(
+                Comment.objects.filter(parent_comment_id__in=parents[start:start + BATCH_SIZE])
+                .select_related('parent_comment').only('id', 'parent_comment__path', 'parent_comment__depth')
+            )
+            for comment in level:
+                parent = comment.parent_comment
+                comment.path = parent.path + path_segment(parent.pk)
+                comment.depth = parent.depth + 1
+            Comment.objects.bulk_update(level, ['path', 'depth'], batch_size=BATCH_SIZE)
+            children += [comment.pk for comment in level]
+        parents = children
+
+
+def restore_fts_triggers(apps, schema_editor):
+    # Adding or removing a NOT NULL column rebuilds the table on SQLite, which drops its triggers
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    search_index = import_module('club_blog.migrations.0005_search_index')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = {name for name, in cursor.fetchall()}
+        if 'club_blog_comment_fts' not in existing:
+            return
+        for statement in search_index.FTS_SQL:
+            if statement.startswith('CREATE TRIGGER club_blog_comment_fts_') and statement.split()[2] not in existing:
+                cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('club_blog', '0006_blog_access_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_fts_triggers),
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['path'], name='comment_path_idx'),
+        ),
+        migrations.RunPython(restore_fts_triggers, migrations.RunPython.noop),
+    ]
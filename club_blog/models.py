@@ -1,13 +1,38 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# Comment.path holds the ids of a comment's ancestors, root first, as
+# fixed-width base36 segments; top-level comments have an empty path. The
+# comments under another are then exactly the rows whose path starts with its
+# subtree_prefix: one range scan on comment_path_idx (see club_blog.comment_tree).
+PATH_WIDTH = 8  # ids up to 36**8 (2.8e12)
+PATH_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def path_segment(pk):
+    digits = ''
+    while pk:
+        pk, digit = divmod(pk, 36)
+        digits = PATH_DIGITS[digit] + digits
+    return digits.rjust(PATH_WIDTH, '0')
+
 class Post(models.Model):
     title = models.CharField(max_length=255)
     content = models.TextField()
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Denormalized counters, maintained by club_blog.counters
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # The feed: newest first, keyset-paginated on (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='post_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -19,6 +44,59 @@ class Comment(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     parent_comment = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies')
+    # Materialized ancestor path and nesting level, maintained by club_blog.comment_tree
+    path = models.TextField(default='', blank=True, editable=False)
+    depth = models.PositiveIntegerField(default=0, editable=False)
+    # Denormalized counters, maintained by club_blog.counters
+    like_count = models.PositiveIntegerField(default=0)
+    reply_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # A post's comments in thread order, and its top-level comments alone
+            models.Index(fields=['post', 'created_at', 'id'], name='comment_post_created_idx'),
+            models.Index(
+                fields=['post', 'created_at', 'id'], condition=models.Q(parent_comment__isnull=True),
+                name='comment_top_level_idx',
+            ),
+            # Replies of a comment in order
+            models.Index(fields=['parent_comment', 'created_at', 'id'], name='comment_replies_idx'),
+            # Subtrees: every comment under another is one range of paths
+            models.Index(fields=['path'], name='comment_path_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The stored parent, so that saving a new one moves the subtree (see club_blog.signals)
+        if 'parent_comment_id' in field_names:
+            instance._stored_parent_id = instance.parent_comment_id
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        if 'parent_comment_id' in self.__dict__:
+            self._stored_parent_id = self.parent_comment_id
+
+    def parent_error(self, parent):
+        """Why parent cannot hold this comment, or None if it can."""
+        if parent is None:
+            return None
+        if self.post_id and parent.post_id != self.post_id:
+            return "The parent comment belongs to another post."
+        if self.pk and (parent.pk == self.pk or parent.path.startswith(self.subtree_prefix)):
+            return "A comment cannot be moved under its own replies."
+        return None
+
+    def clean(self):
+        error = self.parent_error(self.parent_comment) if self.parent_comment_id else None
+        if error:
+            raise ValidationError({'parent_comment': error})
+
+    @property
+    def subtree_prefix(self):
+        # The path of this comment's direct replies, and the prefix of every path below it
+        return self.path + path_segment(self.pk)
 
     def __str__(self):
         return f"Comment by {self.author} on {self.post}"
@@ -31,7 +109,15 @@ class Like(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        unique_together = ('user', 'post', 'comment')  # Prevent the same like for the same post/comment by the same user
+        # NULLs never collide in a unique index, so post likes and comment likes get one partial constraint each
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], condition=models.Q(comment__isnull=True), name='unique_post_like'),
+            models.UniqueConstraint(fields=['user', 'comment'], condition=models.Q(post__isnull=True), name='unique_comment_like'),
+            models.CheckConstraint(
+                condition=models.Q(post__isnull=False, comment__isnull=True) | models.Q(post__isnull=True, comment__isnull=False),
+                name='like_targets_post_or_comment',
+            ),
+        ]
 
     def __str__(self):
         if self.post:
@@ -0,0 +1,76 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+# Cursors are opaque to clients: a url-safe base64 blob of the last row's (created_at, id)
+def encode_cursor(created_at, pk):
+    raw = json.dumps([created_at.isoformat(), pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, pk = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, TypeError, binascii.Error):
+        raise InvalidCursor("Invalid cursor")
+
+
+def get_page_size(params, default=None, maximum=None):
+    # params is request.query_params (DRF) or request.GET (plain Django)
+    default = default or settings.BLOG_FEED_PAGE_SIZE
+    maximum = maximum or settings.BLOG_FEED_MAX_PAGE_SIZE
+    try:
+        page_size = int(params.get('page_size', default))
+    except (TypeError, ValueError):
+        page_size = default
+    return max(1, min(page_size, maximum))
+
+
+def keyset_page_query(queryset, cursor, page_size, descending=True):
+    """
+    Order a queryset on (created_at, id) and slice the page after cursor.
+
+    Fetches page_size + 1 rows so the next cursor can be emitted without a
+    separate COUNT query; evaluate it and pass the rows to finish_page().
+    """
+    if descending:
+        queryset = queryset.order_by('-created_at', '-id')
+    else:
+        queryset = queryset.order_by('created_at', 'id')
+
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        if descending:
+            after = Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        else:
+            after = Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+        queryset = queryset.filter(after)
+    return queryset[:page_size + 1]
+
+
+def finish_page(rows, page_size):
+    """Trim the look-ahead row; works on model and .values() rows alike. Returns (rows, next_cursor)."""
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        if isinstance(last, dict):
+            next_cursor = encode_cursor(last['created_at'], last['id'])
+        else:
+            next_cursor = encode_cursor(last.created_at, last.id)
+    return rows, next_cursor
+
+
+def paginate_keyset(queryset, cursor, page_size, descending=True):
+    return finish_page(list(keyset_page_query(queryset, cursor, page_size, descending)), page_size)
@@ -0,0 +1,266 @@
+import html
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.db import connection
+from django.utils import timezone
+
+from .models import Post, Comment
+from .serializers import COMMENT_VALUES, POST_VALUES, serialize_comment_row, serialize_post_row
+
+POST_FTS_TABLE = 'club_blog_post_fts'
+COMMENT_FTS_TABLE = 'club_blog_comment_fts'
+
+# Match markers are control characters so the text can be HTML-escaped afterwards
+MARK_START, MARK_END = '\x02', '\x03'
+SNIPPET_TOKENS = 24
+# Deeper pages are never browsed, and huge ones would overflow the SQL OFFSET
+MAX_PAGE = 1000
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    return [token.lower() for token in TOKEN_RE.findall(text or '')]
+
+
+def render_highlight(text):
+    if text is None:
+        return None
+    return html.escape(text).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+class SQLiteFTSBackend:
+    """
+    Ranked search over the FTS5 tables created by migration 0005.
+
+    The tables use the post/comment tables as external content and are kept
+    in sync by triggers, so cascaded and bulk deletes are covered too.
+    """
+
+    def __init__(self, using=connection):
+        self.connection = using
+
+    @staticmethod
+    def match_expression(terms):
+        # Quote every term so user input can never be parsed as FTS syntax;
+        # the last one is a prefix match for search-as-you-type.
+        quoted = ['"%s"' % term.replace('"', '""') for term in terms]
+        quoted[-1] += '*'
+        return ' '.join(quoted)
+
+    def search(self, terms, limit, offset):
+        expression = self.match_expression(terms)
+        sql = f"""
+            SELECT 'post', rowid, bm25({POST_FTS_TABLE}, 5.0, 1.0) AS score,
+                   highlight({POST_FTS_TABLE}, 0, char(2), char(3)),
+                   snippet({POST_FTS_TABLE}, 1, char(2), char(3), '…', {SNIPPET_TOKENS})
+            FROM {POST_FTS_TABLE} WHERE {POST_FTS_TABLE} MATCH %s
+            UNION ALL
+            SELECT 'comment', rowid, bm25({COMMENT_FTS_TABLE}) AS score, NULL,
+                   snippet({COMMENT_FTS_TABLE}, 0, char(2), char(3), '…', {SNIPPET_TOKENS})
+            FROM {COMMENT_FTS_TABLE} WHERE {COMMENT_FTS_TABLE} MATCH %s
+            ORDER BY score LIMIT %s OFFSET %s
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, [expression, expression, limit, offset])
+            # bm25() is lower-is-better; flip it so higher scores rank first
+            return [(kind, pk, -score, title, snippet) for kind, pk, score, title, snippet in cursor.fetchall()]
+
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            for table in (POST_FTS_TABLE, COMMENT_FTS_TABLE):
+                cursor.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+        return Post.objects.count(), Comment.objects.count()
+
+
+class PythonIndexBackend:
+    """
+    In-process BM25 inverted index for databases without FTS5.
+
+    Built from the database on first use and then updated by the Post/Comment
+    save and delete receivers. It lives in each process, so with several
+    workers an edit shows up in another worker's results only after that
+    worker rebuilds (e.g. on restart).
+    """
+
+    K1 = 1.2
+    B = 0.75
+    FIELD_WEIGHTS = {'title': 5.0, 'content': 1.0}
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._postings = defaultdict(dict)  # term -> {doc key: weighted term frequency}
+        self._documents = {}  # doc key -> {field: text}
+        self._lengths = {}  # doc key -> weighted length
+
+    def _index(self, key, fields):
+        self._unindex(key)
+        frequencies = Counter()
+        for field, text in fields.items():
+            for token in tokenize(text):
+                frequencies[token] += self.FIELD_WEIGHTS[field]
+        for token, frequency in frequencies.items():
+            self._postings[token][key] = frequency
+        self._documents[key] = fields
+        self._lengths[key] = sum(frequencies.values())
+
+    def _unindex(self, key):
+        fields = self._documents.pop(key, None)
+        if fields is None:
+            return
+        self._lengths.pop(key, None)
+        for field, text in fields.items():
+            for token in set(tokenize(text)):
+                postings = self._postings.get(token)
+                if postings is not None:
+                    postings.pop(key, None)
+                    if not postings:
+                        del self._postings[token]
+
+    def rebuild(self):
+        with self._lock:
+            self._postings.clear()
+            self._documents.clear()
+            self._lengths.clear()
+            posts = comments = 0
+            for pk, title, content in Post.objects.values_list('id', 'title', 'content').iterator():
+                self._index(('post', pk), {'title': title, 'content': content})
+                posts += 1
+            for pk, content in Comment.objects.values_list('id', 'content').iterator():
+                self._index(('comment', pk), {'content': content})
+                comments += 1
+            self._built = True
+        return posts, comments
+
+    def update(self, instance, deleted=False):
+        with self._lock:
+            if not self._built:
+                return  # Picked up by the first rebuild
+            key = ('post' if isinstance(instance, Post) else 'comment', instance.pk)
+            if deleted:
+                self._unindex(key)
+            elif isinstance(instance, Post):
+                self._index(key, {'title': instance.title, 'content': instance.content})
+            else:
+                self._index(key, {'content': instance.content})
+
+    def discard(self, kind, queryset):
+        # For bulk deletes that skip the delete receivers; call before deleting
+        with self._lock:
+            if not self._built:
+                return
+            for pk in queryset.values_list('id', flat=True):
+                self._unindex((kind, pk))
+
+    def _candidates(self, terms):
+        # Every term must match; the last one as a prefix
+        sets = [set(self._postings.get(term, ())) for term in terms[:-1]]
+        prefix = terms[-1]
+        last = set()
+        for token, postings in self._postings.items():
+            if token.startswith(prefix):
+                last.update(postings)
+        sets.append(last)
+        return set.intersection(*sets), [term for term in self._postings if term.startswith(prefix)]
+
+    def search(self, terms, limit, offset):
+        with self._lock:
+            if not self._built:
+                self.rebuild()
+            candidates, prefix_terms = self._candidates(terms)
+            if not candidates:
+                return []
+            total = len(self._documents)
+            average = sum(self._lengths.values()) / total or 1.0
+            scoring_terms = set(terms[:-1]) | set(prefix_terms)
+            scored = []
+            for key in candidates:
+                score = 0.0
+                length = self._lengths[key]
+                for term in scoring_terms:
+                    postings = self._postings.get(term, {})
+                    frequency = postings.get(key)
+                    if not frequency:
+                        continue
+                    idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                    score += idf * frequency * (self.K1 + 1) / (frequency + self.K1 * (1 - self.B + self.B * length / average))
+                scored.append((score, key))
+            scored.sort(key=lambda item: (-item[0], item[1]))
+
+            results = []
+            patterns = [re.escape(term) + r'\b' for term in terms[:-1]] + [re.escape(terms[-1]) + r'\w*']
+            matcher = re.compile(r'\b(?:%s)' % '|'.join(patterns), re.IGNORECASE)
+            for score, (kind, pk) in scored[offset:offset + limit]:
+                fields = self._documents[(kind, pk)]
+                title = matcher.sub(lambda m: MARK_START + m.group(0) + MARK_END, fields['title']) if kind == 'post' else None
+                results.append((kind, pk, score, title, self._snippet(fields['content'], matcher)))
+            return results
+
+    @staticmethod
+    def _snippet(text, matcher):
+        words = text.split()
+        hit = next((i for i, word in enumerate(words) if matcher.search(word)), 0)
+        start = max(0, hit - SNIPPET_TOKENS // 2)
+        window = words[start:start + SNIPPET_TOKENS]
+        snippet = ' '.join(matcher.sub(lambda m: MARK_START + m.group(0) + MARK_END, word) for word in window)
+        if start > 0:
+            snippet = '…' + snippet
+        if start + SNIPPET_TOKENS < len(words):
+            snippet += '…'
+        return snippet
+
+
+python_index = PythonIndexBackend()
+
+_fts_available = {}
+
+
+def get_search_backend():
+    if connection.vendor == 'sqlite':
+        key = (connection.alias, connection.settings_dict['NAME'])
+        if key not in _fts_available:
+            _fts_available[key] = POST_FTS_TABLE in connection.introspection.table_names()
+        if _fts_available[key]:
+            return SQLiteFTSBackend()
+    return python_index
+
+
+def search(query, page, page_size):
+    """
+    Search posts and comments; returns (results, has_next).
+
+    Hits come ranked from the backend, then the matching posts and comments
+    are loaded with their authors in one query each.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return [], False
+
+    hits = get_search_backend().search(terms, page_size + 1, (page - 1) * page_size)
+    has_next = len(hits) > page_size
+    hits = hits[:page_size]
+
+    post_ids = [pk for kind, pk, *_ in hits if kind == 'post']
+    comment_ids = [pk for kind, pk, *_ in hits if kind == 'comment']
+    posts = {row['id']: row for row in Post.objects.filter(pk__in=post_ids).values(*POST_VALUES)}
+    comments = {row['id']: row for row in Comment.objects.filter(pk__in=comment_ids).values(*COMMENT_VALUES)}
+
+    tz = timezone.get_current_timezone()
+    results = []
+    for kind, pk, score, title, snippet in hits:
+        if kind == 'post' and pk in posts:
+            item = serialize_post_row(posts[pk], tz)
+            item['highlighted_title'] = render_highlight(title)
+        elif kind == 'comment' and pk in comments:
+            item = serialize_comment_row(comments[pk], tz)
+        else:
+            continue  # Deleted between the index lookup and the load
+        item['type'] = kind
+        item['score'] = score
+        item['snippet'] = render_highlight(snippet)
+        results.append(item)
+    return results, has_next
@@ -1,13 +1,76 @@
 from rest_framework import serializers
 from .models import Post, Comment, Like
+from club_auth.profiles import project_summary, related_values, summary
 from django.contrib.auth import get_user_model
-from club_auth.serializers import UserSerializer
+from django.utils import timezone
 
 User = get_user_model()
 
+
+def format_datetime(value, tz=None):
+    # Same output as DRF's DateTimeField with the default ISO 8601 format. Looking
+    # up the current timezone dominates the cost, so loops pass it in once.
+    text = value.astimezone(tz or timezone.get_current_timezone()).isoformat()
+    return text[:-6] + 'Z' if text.endswith('+00:00') else text
+
+
+# Compact author embed used on every blog payload instead of the full UserSerializer
+class AuthorSummaryField(serializers.Field):
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, author):
+        return summary(author.id, author.name, author.role, author.avatar.name, author.avatar_hash)
+
+
+# Plain-function serializers for the read paths. They work on .values() rows
+# fetched with the *_VALUES field lists, so no model instances or DRF fields
+# are built per row. Pass tz=timezone.get_current_timezone() when looping.
+
+AUTHOR_VALUES = related_values('author')
+POST_VALUES = ('id', 'title', 'content', 'created_at', 'like_count', 'comment_count') + AUTHOR_VALUES
+COMMENT_VALUES = ('id', 'post_id', 'content', 'created_at', 'parent_comment_id', 'like_count', 'reply_count') + AUTHOR_VALUES
+
+
+def _with_author(data, row):
+    author = project_summary(row, 'author')
+    data['author'] = author
+    # Flattened author info the clients read next to the embedded author
+    data['author_name'] = author['name']
+    data['author_role'] = author['role']
+    data['author_avatar_url'] = author['avatar']
+    return data
+
+
+def serialize_post_row(row, tz=None):
+    return _with_author({
+        'id': row['id'],
+        'title': row['title'],
+        'content': row['content'],
+        'created_at': format_datetime(row['created_at'], tz),
+        'like_count': row['like_count'],
+        'comment_count': row['comment_count'],
+        'liked_by_me': False,  # Set per viewer by club_blog.likes.with_liked_by_me
+    }, row)
+
+
+def serialize_comment_row(row, tz=None):
+    return _with_author({
+        'id': row['id'],
+        'post': row['post_id'],
+        'content': row['content'],
+        'created_at': format_datetime(row['created_at'], tz),
+        'parent_comment': row['parent_comment_id'],
+        'like_count': row['like_count'],
+        'reply_count': row['reply_count'],
+        'liked_by_me': False,
+    }, row)
+
+
 # Post serializer to create and retrieve posts
 class PostSerializer(serializers.ModelSerializer):
-    author = UserSerializer(read_only=True)  # Use UserSerializer to get full user data
+    author = AuthorSummaryField()
 
     class Meta:
         model = Post
@@ -16,7 +79,7 @@ class PostSerializer(serializers.ModelSerializer):
 
 # Comment serializer to create and retrieve comments
 class CommentSerializer(serializers.ModelSerializer):
-    author = UserSerializer(read_only=True)  # Use UserSerializer to get full user data
+    author = AuthorSummaryField()
     post = serializers.PrimaryKeyRelatedField(read_only=True)
     parent_comment = serializers.PrimaryKeyRelatedField(queryset=Comment.objects.all(), required=False, allow_null=True)
 
@@ -24,6 +87,25 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
         fields = ['id', 'post', 'author', 'content', 'created_at', 'parent_comment']
 
+    def moves_comment(self):
+        """Whether the validated data reattaches the comment being updated to another parent."""
+        return 'parent_comment' in self.validated_data and self._moves(self.validated_data['parent_comment'])
+
+    def _moves(self, parent):
+        return self.instance is not None and getattr(parent, 'pk', None) != self.instance.parent_comment_id
+
+    def validate_parent_comment(self, parent):
+        # A new reply goes on its parent's post (passed as context['post']); a
+        # comment can move to another parent of the same post, but not under itself
+        if self.instance is None:
+            comment = Comment(post=self.context['post']) if 'post' in self.context else None
+        else:
+            comment = self.instance if self._moves(parent) else None
+        error = comment.parent_error(parent) if comment is not None else None
+        if error:
+            raise serializers.ValidationError(error)
+        return parent
+
 
 # Like serializer to like posts and comments
 class LikeSerializer(serializers.ModelSerializer):
@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from club_auth.avatars import avatar_changed
+
+from .cache import invalidate_feed, invalidate_posts
+from .comment_tree import child_path, move_subtree
+from .counters import adjust_comment, adjust_post, release_likes
+from .models import Post, Comment, Like
+from .search import python_index
+
+User = get_user_model()
+
+
+def _deleted_with(origin, model):
+    if isinstance(origin, QuerySet):
+        return origin.model is model
+    return isinstance(origin, model)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_cached_post(sender, instance, **kwargs):
+    invalidate_posts([instance.pk])
+    invalidate_feed()
+
+
+@receiver(post_save, sender=Comment)
+def invalidate_cached_comment(sender, instance, **kwargs):
+    invalidate_posts([instance.post_id])
+
+
+@receiver(pre_save, sender=Comment)
+def set_comment_path(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding:
+        if instance.parent_comment_id and not instance.path:
+            instance.path, instance.depth = child_path(instance.parent_comment)
+    elif update_fields is not None and 'parent_comment' not in update_fields:
+        return
+    elif '_stored_parent_id' in instance.__dict__ and instance.parent_comment_id != instance._stored_parent_id:
+        # A new parent from the API, the admin or a plain save(): the replies move with it
+        move_subtree(instance, instance._stored_parent_id)
+        if update_fields is not None and 'path' not in update_fields:
+            Comment.objects.filter(pk=instance.pk).update(path=instance.path, depth=instance.depth)
+    instance._stored_parent_id = instance.parent_comment_id
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if not created:
+        return
+    adjust_post(instance.post_id, comment_count=1)
+    if instance.parent_comment_id:
+        adjust_comment(instance.parent_comment_id, reply_count=1)
+
+
+# Fires for direct deletes as well as cascades from a parent comment or author
+@receiver(post_delete, sender=Comment)
+def uncount_deleted_comment(sender, instance, origin=None, **kwargs):
+    if _deleted_with(origin, Post):
+        return  # The post and its counters are going away too
+    invalidate_posts([instance.post_id])
+    adjust_post(instance.post_id, comment_count=-1)
+    if instance.parent_comment_id:
+        adjust_comment(instance.parent_comment_id, reply_count=-1)
+
+
+# The FTS5 tables follow via triggers; this only feeds the in-process fallback index
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+def index_saved(sender, instance, **kwargs):
+    python_index.update(instance)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+def unindex_deleted(sender, instance, **kwargs):
+    python_index.update(instance, deleted=True)
+
+
+# Cached details and feed pages embed the author avatar URLs of posts and comments
+@receiver(avatar_changed)
+def invalidate_cached_avatars(sender, user_ids, **kwargs):
+    post_ids = set(Post.objects.filter(author_id__in=user_ids).values_list('id', flat=True))
+    post_ids.update(Comment.objects.filter(author_id__in=user_ids).values_list('post_id', flat=True))
+    invalidate_posts(post_ids)
+    invalidate_feed()
+
+
+# Likes have no delete receivers so unlike stays a single DELETE; cascades
+# from a deleted user are accounted for here instead.
+@receiver(pre_delete, sender=User)
+def release_user_likes(sender, instance, **kwargs):
+    release_likes(Like.objects.filter(user=instance))
@@ -1,3 +1,650 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+from importlib import import_module
+from io import BytesIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from club_auth.authentication import ClubRefreshToken, user_cache
+from club_auth.avatars import process_avatar
+from club_auth.revocation import logouts
+
+from .comment_tree import delete_subtree, descendants, newest_replies, subtree
+from .factories import make_members, make_posts, make_threads, seed_blog
+from .like_buffer import LikeBuffer
+from .management.commands.bench_indexes import hot_queries
+from .models import Post, Comment, Like, path_segment
+from .search import SQLiteFTSBackend, python_index, search
+
+User = get_user_model()
+
+
+# Query budgets per endpoint. They hold whatever the amount of data, so an
+# N+1 (a query per post, comment or author) fails these tests; lower them
+# when an endpoint gets cheaper.
+@override_settings(BLOG_CACHE={'ALIAS': 'blog', 'TIMEOUT': 300, 'FEED_TIMEOUT': 30})
+class BlogQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # 30 posts with 60 comments each, as 15 reply chains 4 deep, and likes on posts and comments
+        cls.post_ids = seed_blog(users=20, posts=30, comments_per_post=60, likes_per_post=15, depth=4, comment_likes=2)
+        cls.member = User.objects.get(studentId=800000)
+        cls.post = Post.objects.get(pk=cls.post_ids[0])
+        cls.thread = Comment.objects.filter(post=cls.post, parent_comment=None).first()
+
+    def setUp(self):
+        caches['blog'].clear()
+        user_cache.clear()
+        logouts.sync(force_rebuild=True)
+        access = ClubRefreshToken.for_user(self.member).access_token
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {access}'}
+
+    @contextmanager
+    def assertMaxQueries(self, limit):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        executed = len(context)
+        self.assertLessEqual(
+            executed, limit,
+            f"{executed} queries, budget is {limit}:\n" + '\n'.join(query['sql'] for query in context.captured_queries),
+        )
+
+    def test_list_posts(self):
+        with self.assertMaxQueries(1):
+            response = self.client.get(reverse('list_posts'), {'page_size': 20})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 20)
+
+        with self.assertMaxQueries(1):
+            response = self.client.get(reverse('list_posts'), {'page_size': 20, 'cursor': response.json()['next_cursor']})
+        self.assertEqual(len(response.json()['results']), 10)
+
+    def test_list_posts_cached(self):
+        self.client.get(reverse('list_posts'))
+        with self.assertMaxQueries(0):
+            self.client.get(reverse('list_posts'))
+
+    def test_post_details(self):
+        # The post, a page of top-level comments and their reply previews
+        with self.assertMaxQueries(3):
+            response = self.client.get(reverse('post_details', args=[self.post.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['comments']), 15)
+        self.assertEqual(len(response.json()['comments'][0]['replies']), 1)
+
+        with self.assertMaxQueries(0):
+            response = self.client.get(reverse('post_details', args=[self.post.pk]), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_post_details_does_not_depend_on_tree_size(self):
+        [quiet] = make_posts([self.member], 1)
+        make_threads([quiet], [self.member], 1)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse('post_details', args=[quiet.pk]))
+        [large] = make_posts([self.member], 1)
+        make_threads([large], list(User.objects.all()), 50, depth=8)
+        with CaptureQueriesContext(connection) as big:
+            self.client.get(reverse('post_details', args=[large.pk]))
+        self.assertEqual(len(big), len(small))
+
+    def test_async_reads(self):
+        with self.assertMaxQueries(1):
+            self.assertEqual(self.client.get(reverse('list_posts_async')).status_code, 200)
+        with self.assertMaxQueries(3):
+            self.assertEqual(self.client.get(reverse('post_details_async', args=[self.post.pk])).status_code, 200)
+
+    def test_search(self):
+        with self.assertMaxQueries(4):
+            response = self.client.get(reverse('search'), {'q': 'body post'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['results'])
+
+    def test_search_page_is_bounded(self):
+        # A huge page would overflow the SQL OFFSET
+        response = self.client.get(reverse('search'), {'q': 'body', 'page': 10**23})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('search'), {'q': 'body', 'page': 1000})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()['next_page'])
+
+    def test_create_post(self):
+        with self.assertMaxQueries(2):
+            response = self.client.post(reverse('create_post'), {'title': 'New', 'content': 'Text'}, **self.auth)
+        self.assertEqual(response.status_code, 201)
+
+    def test_update_post(self):
+        with self.assertMaxQueries(3):
+            response = self.client.put(
+                reverse('update-post', args=[self.post.pk]), {'title': 'Edited', 'content': 'Text'},
+                content_type='application/json', **self.auth,
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_delete_post(self):
+        # The post has 60 comments and their likes; the cascade is collected in batches, not per row
+        with self.assertMaxQueries(7):
+            response = self.client.delete(reverse('delete-post', args=[self.post.pk]), **self.auth)
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Comment.objects.filter(post_id=self.post.pk).exists())
+
+    def test_create_comment(self):
+        with self.assertMaxQueries(6):
+            response = self.client.post(reverse('create_comment', args=[self.post.pk]), {'content': 'Hi'}, **self.auth)
+        self.assertEqual(response.status_code, 201)
+
+    def test_reply_to_comment(self):
+        with self.assertMaxQueries(7):
+            response = self.client.post(reverse('reply_to_comment', args=[self.thread.pk]), {'content': 'Hi'}, **self.auth)
+        self.assertEqual(response.status_code, 201)
+
+    def test_update_comment(self):
+        with self.assertMaxQueries(3):
+            response = self.client.put(
+                reverse('update-comment', args=[self.thread.pk]), {'content': 'Edited'},
+                content_type='application/json', **self.auth,
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_delete_comment(self):
+        # A reply chain 4 deep with its likes, gone in one DELETE each whatever the depth
+        with self.assertMaxQueries(6):
+            response = self.client.delete(reverse('delete-comment', args=[self.thread.pk]), **self.auth)
+        self.assertEqual(response.status_code, 204)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 56)
+
+    def test_like_and_unlike_post(self):
+        [post] = make_posts([self.member], 1)
+        with self.assertMaxQueries(4):
+            response = self.client.post(reverse('like_post', args=[post.pk]), **self.auth)
+        self.assertEqual(response.status_code, 201)
+        with self.assertMaxQueries(5):
+            response = self.client.post(reverse('like_post', args=[post.pk]), **self.auth)
+        self.assertEqual(response.status_code, 200)
+        with self.assertMaxQueries(4):
+            response = self.client.delete(reverse('unlike_post', args=[post.pk]), **self.auth)
+        self.assertEqual(response.json()['like_count'], 0)
+
+    def test_like_and_unlike_comment(self):
+        Like.objects.filter(user=self.member, comment=self.thread).delete()
+        with self.assertMaxQueries(5):
+            response = self.client.post(reverse('like_comment', args=[self.thread.pk]), **self.auth)
+        self.assertEqual(response.status_code, 201)
+        with self.assertMaxQueries(5):
+            response = self.client.delete(reverse('unlike_comment', args=[self.thread.pk]), **self.auth)
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(BLOG_COMMENT_PAGE_SIZE=10, BLOG_REPLY_PREVIEW_SIZE=3)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        [cls.member] = make_members(1)
+        [cls.post] = make_posts([cls.member], 1)
+        cls.comments = make_threads([cls.post], [cls.member], 25, depth=1)
+        cls.replies = [
+            Comment.objects.create(post=cls.post, author=cls.member, content=f'Reply {i}', parent_comment=cls.comments[0])
+            for i in range(7)
+        ]
+
+    def setUp(self):
+        caches['blog'].clear()
+
+    def test_details_first_page_with_previews(self):
+        data = self.client.get(reverse('post_details', args=[self.post.pk])).json()
+        self.assertEqual([comment['id'] for comment in data['comments']], [comment.pk for comment in self.comments[:10]])
+        self.assertIsNotNone(data['comments_next_cursor'])
+        first = data['comments'][0]
+        self.assertEqual(first['reply_count'], 7)
+        self.assertEqual([reply['id'] for reply in first['replies']], [reply.pk for reply in self.replies[:3]])
+        self.assertIsNotNone(first['replies_next_cursor'])
+        self.assertEqual((data['comments'][1]['replies'], data['comments'][1]['replies_next_cursor']), ([], None))
+
+    def test_more_comments(self):
+        cursor = self.client.get(reverse('post_details', args=[self.post.pk])).json()['comments_next_cursor']
+        seen = []
+        while cursor:
+            with CaptureQueriesContext(connection) as queries:
+                data = self.client.get(reverse('post_comments', args=[self.post.pk]), {'cursor': cursor}).json()
+            self.assertLessEqual(len(queries), 2)
+            seen += [comment['id'] for comment in data['results']]
+            cursor = data['next_cursor']
+        self.assertEqual(seen, [comment.pk for comment in self.comments[10:]])
+
+    def test_more_replies(self):
+        first = self.client.get(reverse('post_details', args=[self.post.pk])).json()['comments'][0]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('comment_replies', args=[self.comments[0].pk]), {'cursor': first['replies_next_cursor']},
+            )
+        self.assertLessEqual(len(queries), 2)
+        data = response.json()
+        self.assertEqual([reply['id'] for reply in data['results']], [reply.pk for reply in self.replies[3:]])
+        self.assertIsNone(data['next_cursor'])
+
+    def test_errors(self):
+        self.assertEqual(self.client.get(reverse('post_comments', args=[0])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('comment_replies', args=[0])).status_code, 404)
+        response = self.client.get(reverse('post_comments', args=[self.post.pk]), {'cursor': 'nonsense'})
+        self.assertEqual(response.status_code, 400)
+        # A comment without replies is an empty page, not an error
+        response = self.client.get(reverse('comment_replies', args=[self.comments[1].pk]))
+        self.assertEqual(response.json(), {'results': [], 'next_cursor': None})
+
+
+@override_settings(BLOG_CACHE={'ALIAS': 'blog', 'TIMEOUT': 300, 'FEED_TIMEOUT': 30})
+class LikedByMeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.post_ids = seed_blog(users=5, posts=5, comments_per_post=6, likes_per_post=0, depth=2)
+        cls.member = User.objects.get(studentId=800000)
+        cls.post = Post.objects.get(pk=cls.post_ids[0])
+        cls.comment = Comment.objects.filter(post=cls.post, parent_comment=None).first()
+        cls.reply = cls.comment.replies.first()
+        for target in ({'post': cls.post}, {'comment': cls.comment}, {'comment': cls.reply}):
+            Like.objects.create(user=cls.member, **target)
+
+    def setUp(self):
+        caches['blog'].clear()
+        user_cache.clear()
+        logouts.sync(force_rebuild=True)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {ClubRefreshToken.for_user(self.member).access_token}'}
+
+    def liked(self, items):
+        return {item['id'] for item in items if item['liked_by_me']}
+
+    def test_feed(self):
+        anonymous = self.client.get(reverse('list_posts')).json()['results']
+        self.assertEqual(self.liked(anonymous), set())
+        # One Like query on top of the cached page, whatever the page size
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('list_posts'), **self.auth)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(self.liked(response.json()['results']), {self.post.pk})
+        self.assertIn('Authorization', response['Vary'])
+
+    def test_details(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(reverse('post_details', args=[self.post.pk]), **self.auth).json()
+        self.assertEqual(len(queries), 4)  # The post, comments, reply previews and likes
+        self.assertTrue(data['liked_by_me'])
+        self.assertEqual(self.liked(data['comments']), {self.comment.pk})
+        replies = [reply for comment in data['comments'] for reply in comment['replies']]
+        self.assertEqual(self.liked(replies), {self.reply.pk})
+
+    def test_async_details(self):
+        data = self.client.get(reverse('post_details_async', args=[self.post.pk]), **self.auth).json()
+        self.assertTrue(data['liked_by_me'])
+        self.assertEqual(self.liked(data['comments']), {self.comment.pk})
+
+    def test_comment_pages(self):
+        data = self.client.get(reverse('comment_replies', args=[self.comment.pk]), **self.auth).json()
+        self.assertEqual(self.liked(data['results']), {self.reply.pk})
+
+    def test_etag_per_viewer(self):
+        url = reverse('post_details', args=[self.post.pk])
+        anonymous = self.client.get(url)['ETag']
+        member = self.client.get(url, **self.auth)['ETag']
+        self.assertNotEqual(anonymous, member)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=member, **self.auth).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=member).status_code, 200)
+
+        self.client.delete(reverse('unlike_comment', args=[self.comment.pk]), **self.auth)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=member, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.liked(response.json()['comments']), set())
+
+
+@override_settings(BLOG_CACHE={'ALIAS': 'blog', 'TIMEOUT': 300, 'FEED_TIMEOUT': 30})
+class AvatarInvalidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        [cls.post_id] = seed_blog(users=3, posts=1, comments_per_post=2, likes_per_post=0)
+        cls.author = Post.objects.get(pk=cls.post_id).author
+
+    def setUp(self):
+        caches['blog'].clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def avatar_urls(self):
+        details = self.client.get(reverse('post_details', args=[self.post_id])).json()
+        feed = self.client.get(reverse('list_posts')).json()
+        return details['author']['avatar'], feed['results'][0]['author']['avatar']
+
+    def test_thumbnails_reach_cached_payloads(self):
+        image = BytesIO()
+        Image.new('RGB', (64, 64), 'red').save(image, 'PNG')
+        self.author.avatar = SimpleUploadedFile('red.png', image.getvalue())
+        self.author.save()  # Its on_commit thumbnail job never runs inside the test transaction
+        before = self.avatar_urls()
+
+        # process_avatar normally runs in a worker thread with its own connection
+        with mock.patch('club_auth.avatars.close_old_connections'), self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(process_avatar(self.author.avatar.name), 1)
+        after = self.avatar_urls()
+        self.assertNotEqual(after, before)
+        self.assertIn('/avatars/thumbs/', after[0])
+        self.assertEqual(after[0], after[1])
+
+
+class LikeBufferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.post_ids = seed_blog(users=3, posts=2, comments_per_post=0, likes_per_post=0)
+        cls.member = User.objects.get(studentId=800000)
+
+    def setUp(self):
+        self.buffer = LikeBuffer()
+
+    def likes(self, post_id):
+        return Like.objects.filter(post_id=post_id).count(), Post.objects.get(pk=post_id).like_count
+
+    def test_flush_applies_net_intents(self):
+        first, second = self.post_ids
+        Like.objects.create(user=self.member, post_id=second)
+        Post.objects.filter(pk=second).update(like_count=1)
+
+        self.assertEqual(self.buffer.add(self.member.pk, Post, first), (None, 1))
+        self.buffer.remove(self.member.pk, Post, first)
+        self.assertEqual(self.buffer.add(self.member.pk, Post, first), (None, 1))  # Only the last intent counts
+        self.assertEqual(self.buffer.remove(self.member.pk, Post, second), (None, 0))
+        self.assertEqual(self.likes(first), (0, 0))  # Nothing written before the flush
+
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual((self.likes(first), self.likes(second)), ((1, 1), (0, 0)))
+        self.assertEqual(self.buffer.pending(self.member.pk, 'post', self.post_ids), {})
+        # No delta left over: the optimistic count starts from the stored one again
+        self.assertEqual(self.buffer.remove(self.member.pk, Post, first), (None, 0))
+
+    def test_failed_flush_requeues(self):
+        post_id = self.post_ids[0]
+        self.buffer.add(self.member.pk, Post, post_id)
+        with mock.patch.object(self.buffer, '_apply', side_effect=DatabaseError):
+            with self.assertLogs('club_blog.like_buffer', 'ERROR'):
+                self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.buffer.pending(self.member.pk, 'post', [post_id]), {post_id: True})
+        self.assertEqual(self.buffer.add(self.member.pk, Post, post_id), (None, 1))  # Still counted once
+
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.likes(post_id), (1, 1))
+
+    def test_dead_process_journal_is_replayed_once(self):
+        journal_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, journal_dir)
+        dead = subprocess.Popen([sys.executable, '-c', ''])
+        dead.wait()
+        first, second = self.post_ids
+        with open(os.path.join(journal_dir, f'likes-{dead.pid}.log'), 'w', encoding='utf-8') as journal:
+            journal.write(json.dumps([self.member.pk, 'post', first, True]) + '\n')
+            journal.write(json.dumps([self.member.pk, 'post', second, True]) + '\n')
+            journal.write(json.dumps([self.member.pk, 'post', second, False]) + '\n')
+            journal.write('[%d, "post", ' % self.member.pk)  # Torn by the crash
+
+        recovered = LikeBuffer(journal_dir=journal_dir)
+        self.assertEqual(recovered.pending(self.member.pk, 'post', self.post_ids), {first: True, second: False})
+        recovered.stop()
+        self.assertEqual((self.likes(first), self.likes(second)), ((1, 1), (0, 0)))
+
+        again = LikeBuffer(journal_dir=journal_dir)
+        self.assertEqual(again.pending(self.member.pk, 'post', self.post_ids), {})
+        again.stop()
+        self.assertEqual(os.listdir(journal_dir), [])
+
+    def test_journal_from_earlier_process_with_same_pid_is_replayed(self):
+        # A restarted container hands out the same pids again
+        journal_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, journal_dir)
+        first, second = self.post_ids
+        for name, intents in (
+            (f'likes-{os.getpid()}-0ld.log.flushing', [[first, True], [second, True]]),  # The older batch
+            (f'likes-{os.getpid()}-0ld.log', [[second, False]]),
+        ):
+            with open(os.path.join(journal_dir, name), 'w', encoding='utf-8') as journal:
+                journal.writelines(json.dumps([self.member.pk, 'post', pk, liked]) + '\n' for pk, liked in intents)
+
+        recovered = LikeBuffer(journal_dir=journal_dir)
+        expected = {first: True, second: False}
+        self.assertEqual(recovered.pending(self.member.pk, 'post', self.post_ids), expected)
+        # Crashing again before a flush: the intents were carried over into the new journal
+        recovered._journal.close()
+        again = LikeBuffer(journal_dir=journal_dir)
+        self.assertEqual(again.pending(self.member.pk, 'post', self.post_ids), expected)
+        again.stop()
+        self.assertEqual((self.likes(first), self.likes(second)), ((1, 1), (0, 0)))
+        self.assertEqual(os.listdir(journal_dir), [])
+
+
+class SearchBackendTests:
+    """Search behaviour every backend must share; subclasses pick the backend."""
+
+    backend = None
+
+    @classmethod
+    def setUpTestData(cls):
+        [cls.member] = make_members(1)
+        cls.title_hit = Post.objects.create(author=cls.member, title='<b>Django</b> tips', content='Notes on views.')
+        cls.content_hit = Post.objects.create(author=cls.member, title='Weekly notes', content='We talked about django and <script>.')
+        cls.comment_hit = Comment.objects.create(post=cls.content_hit, author=cls.member, content='Django forms & models')
+        cls.miss = Post.objects.create(author=cls.member, title='Flask', content='Nothing here.')
+
+    def setUp(self):
+        python_index._built = False  # Rebuilt from this test's rows on first search
+        self.addCleanup(setattr, python_index, '_built', False)
+        patcher = mock.patch('club_blog.search.get_search_backend', return_value=self.backend())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def hits(self, query):
+        return [(item['type'], item['id']) for item in search(query, 1, 10)[0]]
+
+    def test_title_ranks_above_content(self):
+        hits = self.hits('django')
+        self.assertEqual(hits[0], ('post', self.title_hit.pk))
+        self.assertEqual(set(hits), {('post', self.title_hit.pk), ('post', self.content_hit.pk), ('comment', self.comment_hit.pk)})
+
+    def test_every_term_must_match_and_last_is_a_prefix(self):
+        self.assertEqual(self.hits('djan'), self.hits('django'))
+        self.assertEqual(self.hits('django forms'), [('comment', self.comment_hit.pk)])
+        self.assertEqual(self.hits('flask django'), [])
+
+    def test_highlights_are_escaped(self):
+        results = {(item['type'], item['id']): item for item in search('django', 1, 10)[0]}
+        post = results[('post', self.title_hit.pk)]
+        self.assertEqual(post['highlighted_title'], '&lt;b&gt;<mark>Django</mark>&lt;/b&gt; tips')
+        self.assertIn('<mark>django</mark> and &lt;script&gt;', results[('post', self.content_hit.pk)]['snippet'])
+        self.assertIn('<mark>Django</mark> forms &amp; models', results[('comment', self.comment_hit.pk)]['snippet'])
+
+    def test_index_follows_writes(self):
+        self.hits('django')  # Builds the in-process index before the writes
+        self.title_hit.title = 'Pyramid tips'
+        self.title_hit.save()
+        post = Post.objects.create(author=self.member, title='Django channels', content='Websockets.')
+        self.comment_hit.delete()
+        self.assertEqual(set(self.hits('django')), {('post', self.content_hit.pk), ('post', post.pk)})
+        self.assertEqual(self.hits('pyramid'), [('post', self.title_hit.pk)])
+
+        reply = Comment.objects.create(post=self.miss, author=self.member, content='Django reply')
+        Comment.objects.create(post=self.miss, author=self.member, content='Django answer', parent_comment=reply)
+        delete_subtree(reply)  # Bulk delete: discarded from the index without receivers
+        self.assertEqual(set(self.hits('django')), {('post', self.content_hit.pk), ('post', post.pk)})
+
+
+@skipUnless(connection.vendor == 'sqlite', "Needs the FTS5 tables from migration 0005")
+class SQLiteFTSSearchTests(SearchBackendTests, TestCase):
+    backend = SQLiteFTSBackend
+
+
+class PythonIndexSearchTests(SearchBackendTests, TestCase):
+    # The fallback for databases without FTS5
+    backend = staticmethod(lambda: python_index)
+
+
+class FactoryTests(TestCase):
+    def test_seed_blog_counters(self):
+        [post_id] = seed_blog(users=5, posts=1, comments_per_post=12, likes_per_post=3, depth=3, comment_likes=1)
+        post = Post.objects.get(pk=post_id)
+        self.assertEqual((post.comment_count, post.like_count), (12, 3))
+        self.assertEqual(Comment.objects.filter(parent_comment=None).count(), 4)
+        self.assertEqual(Like.objects.filter(comment__isnull=False).count(), 12)
+
+    def test_make_members_password(self):
+        [member] = make_members(1, password='secret')
+        self.assertTrue(member.check_password('secret'))
+
+
+class CommentPathTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        [cls.post_id] = seed_blog(users=5, posts=1, comments_per_post=8, likes_per_post=0, depth=4, comment_likes=1)
+        cls.member = User.objects.get(studentId=800000)
+
+    def chain(self):
+        # The first reply chain, top-level comment first
+        comment = Comment.objects.filter(post_id=self.post_id, parent_comment=None).order_by('id').first()
+        chain = [comment]
+        while (comment := comment.replies.first()) is not None:
+            chain.append(comment)
+        return chain
+
+    def test_paths_and_ranges(self):
+        root, child, grandchild, leaf = self.chain()
+        self.assertEqual((root.path, root.depth), ('', 0))
+        self.assertEqual(child.path, path_segment(root.pk))
+        self.assertEqual((leaf.path, leaf.depth), (path_segment(root.pk) + path_segment(child.pk) + path_segment(grandchild.pk), 3))
+        self.assertEqual(set(descendants(root)), {child, grandchild, leaf})
+        self.assertEqual(set(subtree(grandchild)), {grandchild, leaf})
+        self.assertEqual([row['id'] for row in newest_replies(root, 2)], [leaf.pk, grandchild.pk])
+
+    def test_reply_gets_path(self):
+        root = self.chain()[0]
+        comment = Comment.objects.create(post_id=self.post_id, author=self.member, content='Hi', parent_comment=root)
+        self.assertEqual((comment.path, comment.depth), (root.subtree_prefix, 1))
+        self.assertIn(comment, descendants(root))
+
+    def test_backfill_matches_inserted_paths(self):
+        expected = dict(Comment.objects.values_list('id', 'path'))
+        Comment.objects.update(path='', depth=0)
+        import_module('club_blog.migrations.0007_comment_path').backfill_paths(apps, None)
+        self.assertEqual(dict(Comment.objects.values_list('id', 'path')), expected)
+
+    def test_delete_subtree(self):
+        root, child, grandchild, leaf = self.chain()
+        self.assertEqual(delete_subtree(child), 3)
+        self.assertFalse(Comment.objects.filter(pk__in=[child.pk, grandchild.pk, leaf.pk]).exists())
+        self.assertFalse(Like.objects.filter(comment_id__in=[child.pk, grandchild.pk, leaf.pk]).exists())
+        root.refresh_from_db()
+        self.assertEqual((root.reply_count, Post.objects.get(pk=self.post_id).comment_count), (0, 5))
+
+    def test_move_subtree(self):
+        root, child, grandchild, leaf = self.chain()
+        other = Comment.objects.filter(post_id=self.post_id, parent_comment=None).exclude(pk=root.pk).first()
+        response = self.client.put(
+            reverse('update-comment', args=[child.pk]), {'content': 'Moved', 'parent_comment': other.pk},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual({child, grandchild, leaf}, set(descendants(other)))
+        self.assertFalse(descendants(root).exists())
+        leaf.refresh_from_db()
+        self.assertEqual(leaf.depth, 3)
+        root.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((root.reply_count, other.reply_count), (0, 2))
+
+    def test_save_with_new_parent_moves_subtree(self):
+        # Admin edits and plain saves go through the same pre_save receiver as the API
+        root, child, grandchild, leaf = self.chain()
+        grandchild.parent_comment = None
+        grandchild.save()
+        leaf.refresh_from_db()
+        self.assertEqual((grandchild.path, grandchild.depth), ('', 0))
+        self.assertEqual((leaf.path, leaf.depth), (grandchild.subtree_prefix, 1))
+        self.assertFalse(descendants(root).filter(pk__in=[grandchild.pk, leaf.pk]).exists())
+        child.refresh_from_db()
+        self.assertEqual(child.reply_count, 0)
+
+        grandchild.save()  # Unchanged parent: nothing to move
+        self.assertEqual(leaf.path, Comment.objects.get(pk=leaf.pk).path)
+
+    def test_clean_rejects_parent_inside_subtree(self):
+        root, child, grandchild, leaf = self.chain()
+        child.parent_comment = leaf
+        with self.assertRaises(ValidationError):
+            child.full_clean()
+
+    def test_reply_to_comment_on_another_post_is_rejected(self):
+        root = self.chain()[0]
+        [other_post] = make_posts([self.member], 1)
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {ClubRefreshToken.for_user(self.member).access_token}'}
+        data = {'content': 'Hi', 'parent_comment': root.pk}
+        response = self.client.post(reverse('create_comment', args=[other_post.pk]), data, content_type='application/json', **auth)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Comment.objects.filter(post=other_post).exists())
+        # On the parent's own post the reply is accepted
+        response = self.client.post(reverse('create_comment', args=[self.post_id]), data, content_type='application/json', **auth)
+        self.assertEqual(response.status_code, 201)
+
+    def test_move_under_own_reply_is_rejected(self):
+        root, child, grandchild, leaf = self.chain()
+        response = self.client.put(
+            reverse('update-comment', args=[root.pk]), {'content': 'Loop', 'parent_comment': leaf.pk},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@skipUnless(connection.vendor == 'sqlite', "Reads SQLite's EXPLAIN QUERY PLAN output")
+class QueryPlanTests(TestCase):
+    # The index each hot query should be answered from (see migration 0006)
+    EXPECTED_INDEXES = {
+        'feed': 'post_created_idx',
+        'feed_after_cursor': 'post_created_idx',
+        'comment_tree': 'comment_post_created_idx',
+        'top_level_comments': 'comment_top_level_idx',
+        'replies': 'comment_replies_idx',
+        'post_like': 'unique_post_like',
+        'comment_like': 'unique_comment_like',
+        'liked_posts': 'unique_post_like',
+        'liked_by_me': ('unique_post_like', 'unique_comment_like'),  # One per half of the UNION ALL
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.post_ids = seed_blog(users=10, posts=20, comments_per_post=10, likes_per_post=5, comment_likes=1)
+
+    def test_hot_queries_use_indexes(self):
+        post_id = self.post_ids[0]
+        comment_id = Comment.objects.filter(post_id=post_id, parent_comment=None).values_list('id', flat=True)[0]
+        user_id = Like.objects.filter(post_id=post_id).values_list('user_id', flat=True)[0]
+        queries = hot_queries(post_id, comment_id, user_id, self.post_ids)
+        self.assertEqual(set(queries), set(self.EXPECTED_INDEXES))
+        for name, queryset in queries.items():
+            with self.subTest(name):
+                plan = queryset.explain()
+                expected = self.EXPECTED_INDEXES[name]
+                for index in (expected,) if isinstance(expected, str) else expected:
+                    self.assertIn(f'USING INDEX {index}', plan)
+                self.assertNotIn('TEMP B-TREE', plan)  # No sort step: rows come out in index order
+
+    def test_subtree_uses_path_index(self):
+        comment = Comment.objects.filter(post_id=self.post_ids[0], parent_comment=None).first()
+        self.assertIn('USING INDEX comment_path_idx', descendants(comment).explain())
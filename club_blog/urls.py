@@ -1,9 +1,14 @@
 from django.urls import path
-from . import views
+from . import views, async_views
 
 urlpatterns = [
     path('posts/', views.list_posts, name='list_posts'),
     path('post/<int:post_id>/details/', views.get_post_details, name='post_details'),
+    path('post/<int:post_id>/comments/', views.post_comments, name='post_comments'),
+    path('comment/<int:comment_id>/replies/', views.comment_replies, name='comment_replies'),
+    path('async/posts/', async_views.list_posts, name='list_posts_async'),
+    path('async/post/<int:post_id>/details/', async_views.get_post_details, name='post_details_async'),
+    path('search/', views.search, name='search'),
     path('post/', views.create_post, name='create_post'),
     path('post/<int:post_id>/update/', views.update_post, name='update-post'), 
     path('post/<int:post_id>/delete/', views.delete_post, name='delete-post'),
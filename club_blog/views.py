@@ -1,10 +1,19 @@
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Post, Comment, Like
-from .serializers import PostSerializer, CommentSerializer, LikeSerializer
+from .models import Post, Comment
+from .serializers import PostSerializer, CommentSerializer, POST_VALUES, serialize_post_row
+from .comment_tree import comment_page, delete_subtree, direct_replies, top_level_comments
+from .pagination import InvalidCursor, get_page_size, paginate_keyset
+from .cache import conditional_response, feed_key, get_or_build, make_etag, post_key
+from .search import MAX_PAGE as MAX_SEARCH_PAGE, search as search_index
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from .likes import add_like, remove_like, with_liked_by_me
+from club_auth.authentication import full_user
 
 User = get_user_model()
 
@@ -12,68 +21,87 @@ User = get_user_model()
 @api_view(['GET'])
 @permission_classes([AllowAny])  # Allow any user to view posts
 def list_posts(request):
-    posts = Post.objects.all()
-    serializer = PostSerializer(posts, many=True)
-    return Response(serializer.data)
+    cursor = request.query_params.get('cursor')
+    page_size = get_page_size(request.query_params)
+
+    def build():
+        page, next_cursor = paginate_keyset(Post.objects.values(*POST_VALUES), cursor, page_size)
+        tz = timezone.get_current_timezone()
+        return {"results": [serialize_post_row(row, tz) for row in page], "next_cursor": next_cursor}
+
+    try:
+        etag, data = get_or_build(feed_key(cursor, page_size), settings.BLOG_CACHE['FEED_TIMEOUT'], build)
+    except InvalidCursor:
+        return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+    return conditional_response(request, *with_liked_by_me(request.user.id, etag, data))
 
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_post_details(request, post_id):
+    def build():
+        post = Post.objects.values(*POST_VALUES).get(id=post_id)
+
+        # Prepare the response data for the post, with the first page of its comments
+        post_data = serialize_post_row(post)
+        page = comment_page(top_level_comments(post_id), None, settings.BLOG_COMMENT_PAGE_SIZE, settings.BLOG_REPLY_PREVIEW_SIZE)
+        post_data['comments'], post_data['comments_next_cursor'] = page['results'], page['next_cursor']
+        return post_data
+
     try:
-        post = Post.objects.get(id=post_id)
+        etag, post_data = get_or_build(post_key(post_id), settings.BLOG_CACHE['TIMEOUT'], build)
     except Post.DoesNotExist:
         return Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
-    
-    # Retrieve comments with related data
-    comments = Comment.objects.filter(post=post, parent_comment__isnull=True).prefetch_related(
-        'author', 'likes', 'replies__author', 'replies__likes'
-    )
-    
-    comment_data = CommentSerializer(comments, many=True).data
-    
-    # Add likes and replies to comments
-    for comment in comment_data:
-        # Get likes for the comment
-        comment_likes = Like.objects.filter(comment_id=comment['id'])
-        comment['like_count'] = comment_likes.count()  # Add like count for the comment
-        
-        # Add author info for the comment (access author attributes directly)
-        comment_author = comment['author']
-        comment['author_name'] = comment_author['name'] if isinstance(comment_author, dict) else comment_author.name
-        comment['author_role'] = comment_author['role'] if isinstance(comment_author, dict) else comment_author.role
-        comment['author_avatar_url'] = comment_author['avatar'].url if hasattr(comment_author, 'avatar') else None
-        
-        # Get replies for the comment and process them
-        comment['replies'] = []
-        for reply in comment.get('replies', []):
-            reply_likes = Like.objects.filter(comment_id=reply['id'])
-            reply['like_count'] = reply_likes.count()  # Add like count for the reply
-            
-            # Add author info for the reply (access author attributes directly)
-            reply_author = reply['author']
-            reply['author_name'] = reply_author['name'] if isinstance(reply_author, dict) else reply_author.name
-            reply['author_role'] = reply_author['role'] if isinstance(reply_author, dict) else reply_author.role
-            reply['author_avatar_url'] = reply_author['avatar'].url if hasattr(reply_author, 'avatar') else None
-            
-            comment['replies'].append(reply)
-    
-    # Get likes for the post
-    post_likes = Like.objects.filter(post=post)
-    post_like_count = post_likes.count()
-    
-    # Prepare the response data for the post
-    post_data = PostSerializer(post).data
-    post_data['comments'] = comment_data
-    post_data['like_count'] = post_like_count
-    
-    # Add author info for the post
-    post_author = post.author
-    post_data['author_name'] = post_author.name
-    post_data['author_role'] = post_author.role
-    post_data['author_avatar_url'] = post_author.avatar.url if hasattr(post_author, 'avatar') else None
-    
-    return Response(post_data, status=status.HTTP_200_OK)
+    return conditional_response(request, *with_liked_by_me(request.user.id, etag, post_data))
+
+
+# More top-level comments of a post, from the details' comments_next_cursor
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def post_comments(request, post_id):
+    cursor = request.query_params.get('cursor')
+    page_size = get_page_size(request.query_params, default=settings.BLOG_COMMENT_PAGE_SIZE)
+    try:
+        page = comment_page(top_level_comments(post_id), cursor, page_size, settings.BLOG_REPLY_PREVIEW_SIZE)
+    except InvalidCursor:
+        return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+    if not page['results'] and not cursor and not Post.objects.filter(id=post_id).exists():
+        return Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
+    return conditional_response(request, *with_liked_by_me(request.user.id, make_etag(page), page))
+
+
+# More replies to a comment, from a comment's replies_next_cursor
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def comment_replies(request, comment_id):
+    cursor = request.query_params.get('cursor')
+    page_size = get_page_size(request.query_params, default=settings.BLOG_COMMENT_PAGE_SIZE)
+    try:
+        page = comment_page(direct_replies(comment_id), cursor, page_size, settings.BLOG_REPLY_PREVIEW_SIZE)
+    except InvalidCursor:
+        return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+    if not page['results'] and not cursor and not Comment.objects.filter(id=comment_id).exists():
+        return Response({"error": "Comment not found"}, status=status.HTTP_404_NOT_FOUND)
+    return conditional_response(request, *with_liked_by_me(request.user.id, make_etag(page), page))
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def search(request):
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({"error": "Query parameter 'q' is required"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        page = max(1, int(request.query_params.get('page', 1)))
+    except ValueError:
+        return Response({"error": "Invalid page"}, status=status.HTTP_400_BAD_REQUEST)
+    if page > MAX_SEARCH_PAGE:
+        return Response({"error": f"page cannot be above {MAX_SEARCH_PAGE}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    results, has_next = search_index(query, page, get_page_size(request.query_params))
+    data = {"results": results, "page": page, "next_page": page + 1 if has_next and page < MAX_SEARCH_PAGE else None}
+    _, data = with_liked_by_me(request.user.id, None, data)
+    return Response(data)
 
 
 # Create a post
@@ -82,7 +110,7 @@ def get_post_details(request, post_id):
 def create_post(request):
     serializer = PostSerializer(data=request.data)
     if serializer.is_valid():
-        post = serializer.save(author=request.user)  # Assuming the user is authenticated
+        post = serializer.save(author=full_user(request.user))  # Assuming the user is authenticated
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -122,9 +150,10 @@ def create_comment(request, post_id):
     except Post.DoesNotExist:
         return Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    serializer = CommentSerializer(data=request.data)
+    serializer = CommentSerializer(data=request.data, context={'post': post})
     if serializer.is_valid():
-        serializer.save(author=request.user, post=post)  # Attach post and user to the comment
+        with transaction.atomic():  # Counters are bumped by the post_save receiver
+            serializer.save(author=full_user(request.user), post=post)  # Attach post and user to the comment
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -138,7 +167,11 @@ def update_comment(request, comment_id):
 
     serializer = CommentSerializer(comment, data=request.data, partial=False)  # Full update
     if serializer.is_valid():
-        serializer.save()
+        if serializer.moves_comment():
+            with transaction.atomic():  # The replies move along with it (see club_blog.signals)
+                serializer.save()
+        else:
+            serializer.save()
         return Response(serializer.data, status=status.HTTP_200_OK)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -149,7 +182,7 @@ def delete_comment(request, comment_id):
     except Comment.DoesNotExist:
         return Response({"error": "Comment not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    comment.delete()
+    delete_subtree(comment)  # With every reply under it
     return Response({"message": "Comment deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
 
 
@@ -167,7 +200,8 @@ def reply_to_comment(request, comment_id):
 
     serializer = CommentSerializer(data=request.data)
     if serializer.is_valid():
-        serializer.save(author=request.user, post=parent_comment.post, parent_comment=parent_comment)  
+        with transaction.atomic():
+            serializer.save(author=full_user(request.user), post_id=parent_comment.post_id, parent_comment=parent_comment)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -181,17 +215,15 @@ def like_post(request, post_id):
         return Response({"error": "Authentication required"}, status=status.HTTP_401_UNAUTHORIZED)
 
     try:
-        post = Post.objects.get(id=post_id)
+        created, like_count = add_like(request.user.id, Post, post_id)
     except Post.DoesNotExist:
         return Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    # Check if the user has already liked the post
-    if Like.objects.filter(user=request.user, post=post).exists():
-        return Response({"error": "You have already liked this post"}, status=status.HTTP_400_BAD_REQUEST)
-
-    # Create a like for the post
-    like = Like.objects.create(user=request.user, post=post)
-    return Response({"message": "Post liked successfully"}, status=status.HTTP_201_CREATED)
+    if created is None:
+        return Response({"message": "Post like accepted", "liked": True, "like_count": like_count}, status=status.HTTP_202_ACCEPTED)
+    if not created:
+        return Response({"message": "You have already liked this post", "liked": True, "like_count": like_count}, status=status.HTTP_200_OK)
+    return Response({"message": "Post liked successfully", "liked": True, "like_count": like_count}, status=status.HTTP_201_CREATED)
 
 
 # View to unlike a Post
@@ -201,18 +233,14 @@ def unlike_post(request, post_id):
         return Response({"error": "Authentication required"}, status=status.HTTP_401_UNAUTHORIZED)
 
     try:
-        post = Post.objects.get(id=post_id)
+        deleted, like_count = remove_like(request.user.id, Post, post_id)
     except Post.DoesNotExist:
         return Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    # Check if the user has liked the post
-    like = Like.objects.filter(user=request.user, post=post).first()
-    if not like:
-        return Response({"error": "You have not liked this post"}, status=status.HTTP_400_BAD_REQUEST)
-
-    # Delete the like
-    like.delete()
-    return Response({"message": "Post unliked successfully"}, status=status.HTTP_200_OK)
+    if deleted is None:
+        return Response({"message": "Post unlike accepted", "liked": False, "like_count": like_count}, status=status.HTTP_202_ACCEPTED)
+    message = "Post unliked successfully" if deleted else "You have not liked this post"
+    return Response({"message": message, "liked": False, "like_count": like_count}, status=status.HTTP_200_OK)
 
 
 # View to like a Comment
@@ -223,17 +251,15 @@ def like_comment(request, comment_id):
         return Response({"error": "Authentication required"}, status=status.HTTP_401_UNAUTHORIZED)
 
     try:
-        comment = Comment.objects.get(id=comment_id)
+        created, like_count = add_like(request.user.id, Comment, comment_id)
     except Comment.DoesNotExist:
         return Response({"error": "Comment not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    # Check if the user has already liked the comment
-    if Like.objects.filter(user=request.user, comment=comment).exists():
-        return Response({"error": "You have already liked this comment"}, status=status.HTTP_400_BAD_REQUEST)
-
-    # Create a like for the comment
-    like = Like.objects.create(user=request.user, comment=comment)
-    return Response({"message": "Comment liked successfully"}, status=status.HTTP_201_CREATED)
+    if created is None:
+        return Response({"message": "Comment like accepted", "liked": True, "like_count": like_count}, status=status.HTTP_202_ACCEPTED)
+    if not created:
+        return Response({"message": "You have already liked this comment", "liked": True, "like_count": like_count}, status=status.HTTP_200_OK)
+    return Response({"message": "Comment liked successfully", "liked": True, "like_count": like_count}, status=status.HTTP_201_CREATED)
 
 
 # View to Unlike a Comment
@@ -243,15 +269,11 @@ def unlike_comment(request, comment_id):
         return Response({"error": "Authentication required"}, status=status.HTTP_401_UNAUTHORIZED)
 
     try:
-        comment = Comment.objects.get(id=comment_id)
+        deleted, like_count = remove_like(request.user.id, Comment, comment_id)
     except Comment.DoesNotExist:
         return Response({"error": "Comment not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    # Check if the user has liked the comment
-    like = Like.objects.filter(user=request.user, comment=comment).first()
-    if not like:
-        return Response({"error": "You have not liked this comment"}, status=status.HTTP_400_BAD_REQUEST)
-
-    # Delete the like
-    like.delete()
-    return Response({"message": "Comment unliked successfully"}, status=status.HTTP_200_OK)
+    if deleted is None:
+        return Response({"message": "Comment unlike accepted", "liked": False, "like_count": like_count}, status=status.HTTP_202_ACCEPTED)
+    message = "Comment unliked successfully" if deleted else "You have not liked this comment"
+    return Response({"message": message, "liked": False, "like_count": like_count}, status=status.HTTP_200_OK)
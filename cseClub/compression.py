@@ -0,0 +1,74 @@
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+from .media import accepted_encodings
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE_TYPES = re.compile(r'^(?:text/|application/(?:json|javascript|xml)|image/svg\+xml)')
+
+
+class CompressionMiddleware:
+    """
+    Compress API responses with brotli (when installed) or gzip.
+
+    Only non-streaming bodies of a compressible type above MIN_SIZE are
+    touched: smaller ones gain little, and media files are either already
+    compressed or have precompressed siblings (see cseClub.media). gzip
+    output carries Django's random-length header padding against BREACH.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.options = settings.COMPRESSION
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.compress(request, await self.get_response(request))
+
+    def compress(self, request, response):
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or not COMPRESSIBLE_TYPES.match(response.get('Content-Type', ''))
+            or len(response.content) < self.options['MIN_SIZE']
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        if brotli is not None and 'br' in accepted:
+            encoding = 'br'
+            compressed = brotli.compress(response.content, quality=self.options['BROTLI_QUALITY'])
+        elif 'gzip' in accepted:
+            encoding = 'gzip'
+            compressed = compress_string(response.content, max_random_bytes=100)
+        else:
+            return response
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # The encoded bytes differ from the identity ones: a strong ETag becomes weak
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
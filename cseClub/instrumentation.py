@@ -0,0 +1,224 @@
+import hmac
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+
+from club_auth.revocation import logouts
+
+logger = logging.getLogger(__name__)
+
+OPTIONS = settings.INSTRUMENTATION
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'db_seconds', 'serialize_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+
+
+# The metrics of the request being handled. Contexts are copied into
+# sync_to_async threads, so queries run by async views land here too.
+_current = ContextVar('request_metrics', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_seconds += time.perf_counter() - started
+
+
+def record_serialization(seconds):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.serialize_seconds += seconds
+
+
+def install(connection, **kwargs):
+    # Stays on the connection for its lifetime; outside a request it is one ContextVar lookup
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name, self.help_text, self.buckets = name, help_text, buckets
+        self.series = {}  # view -> [bucket counts..., sum, count]
+
+    def observe(self, view, value):
+        series = self.series.get(view)
+        if series is None:
+            series = self.series[view] = [0] * (len(self.buckets) + 2)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def exposition(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for view, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{view="{view}",le="+Inf"}} {series[-1]}')
+            lines.append(f'{self.name}_sum{{view="{view}"}} {series[-2]}')
+            lines.append(f'{self.name}_count{{view="{view}"}} {series[-1]}')
+        return lines
+
+
+class Registry:
+    """In-process aggregates per URL name, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {
+            'latency': Histogram('http_request_duration_seconds', 'Total time spent handling the request.', SECONDS_BUCKETS),
+            'db': Histogram('http_request_db_seconds', 'Time spent in SQL queries per request.', SECONDS_BUCKETS),
+            'serialize': Histogram('http_request_serialize_seconds', 'Time spent encoding JSON per request.', SECONDS_BUCKETS),
+            'queries': Histogram('http_request_queries', 'SQL queries per request.', QUERY_BUCKETS),
+        }
+        self.responses = {}  # (view, status) -> count
+        self.over_budget = {}  # view -> count
+
+    def observe(self, view, status, metrics, seconds, over_budget):
+        with self._lock:
+            self.histograms['latency'].observe(view, seconds)
+            self.histograms['db'].observe(view, metrics.db_seconds)
+            self.histograms['serialize'].observe(view, metrics.serialize_seconds)
+            self.histograms['queries'].observe(view, metrics.queries)
+            self.responses[view, status] = self.responses.get((view, status), 0) + 1
+            if over_budget:
+                self.over_budget[view] = self.over_budget.get(view, 0) + 1
+
+    def exposition(self):
+        with self._lock:
+            lines = []
+            for histogram in self.histograms.values():
+                lines.extend(histogram.exposition())
+            lines += ['# HELP http_responses_total Responses by URL name and status.', '# TYPE http_responses_total counter']
+            lines += [
+                f'http_responses_total{{view="{view}",status="{status}"}} {count}'
+                for (view, status), count in sorted(self.responses.items())
+            ]
+            lines += [
+                '# HELP http_requests_over_query_budget_total Requests that ran more than QUERY_BUDGET queries.',
+                '# TYPE http_requests_over_query_budget_total counter',
+            ]
+            lines += [f'http_requests_over_query_budget_total{{view="{view}"}} {count}' for view, count in sorted(self.over_budget.items())]
+
+        for key, value in logouts.stats().items():
+            lines.append(f'# TYPE token_logout_{key} gauge')
+            lines.append(f'token_logout_{key} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'  # 404s and responses from middleware (e.g. media files)
+    return match.view_name
+
+
+class InstrumentationMiddleware:
+    """
+    Measure every request: SQL query count and time, JSON encoding time and
+    total latency. The numbers are aggregated per URL name for the metrics
+    endpoint, sent back in a Server-Timing header when SERVER_TIMING is on,
+    and a warning is logged when a request runs more queries than
+    QUERY_BUDGET.
+
+    Put it first in MIDDLEWARE so the total includes the other middleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # Connections opened before this module was imported (e.g. by checks) miss connection_created
+        for alias in connections:
+            install(connections[alias])
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - started)
+
+    def finish(self, request, response, metrics, seconds):
+        view = view_name(request)
+        over_budget = metrics.queries > OPTIONS['QUERY_BUDGET']
+        if over_budget:
+            logger.warning(
+                "%s %s (%s) ran %d queries, over the budget of %d",
+                request.method, request.path, view, metrics.queries, OPTIONS['QUERY_BUDGET'],
+            )
+        registry.observe(view, response.status_code, metrics, seconds, over_budget)
+        if OPTIONS['SERVER_TIMING']:
+            response['Server-Timing'] = (
+                f'db;dur={metrics.db_seconds * 1000:.2f};desc="{metrics.queries} queries", '
+                f'serialize;dur={metrics.serialize_seconds * 1000:.2f}, '
+                f'total;dur={seconds * 1000:.2f}'
+            )
+        return response
+
+
+def metrics(request):
+    """
+    Prometheus scrape endpoint.
+
+    Answers only requests bearing METRICS_TOKEN from METRICS_ALLOWED_IPS, and
+    is a 404 while no token is configured.
+    """
+    token = OPTIONS['METRICS_TOKEN']
+    if not token or request.META.get('REMOTE_ADDR') not in OPTIONS['METRICS_ALLOWED_IPS']:
+        raise Http404
+    scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(credentials.strip().encode(), token.encode()):
+        raise Http404
+    return HttpResponse(registry.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,207 @@
+import mimetypes
+import os
+import re
+import stat
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+
+# Content-addressed names never change meaning: only the avatar thumbnails
+# (club_auth.avatars.thumbnail_name). Other uploads can be replaced under the
+# same name, however hash-like it looks (e.g. IMG_20231015123456.jpg).
+HASHED_NAME_RE = re.compile(r'^avatars/thumbs/[0-9a-f]{2}/[0-9a-f]{32}-\d+\.(?:webp|jpeg)$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Precompressed siblings, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+BLOCK_SIZE = 64 * 1024
+
+
+def _file_ranges(path, start, end):
+    with open(path, 'rb') as source:
+        source.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            block = source.read(min(BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+
+def accepted_encodings(header):
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def parse_range(header, size):
+    """(start, end) for a single satisfiable byte range; None to ignore the header; False if unsatisfiable."""
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None  # Multiple or malformed ranges: send the whole file
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+class MediaFilesMiddleware:
+    """
+    Serve MEDIA_ROOT (and STATIC_ROOT once collected) without going through URL routing.
+
+    Whole files are returned as FileResponse, so WSGI servers with
+    wsgi.file_wrapper send them with sendfile(). Conditional requests get
+    304s from the ETag/Last-Modified pair, a single Range gets a 206, and a
+    .br or .gz sibling is served in place of the file when the client
+    accepts that encoding. Avatar thumbnails are cached for a year.
+
+    Under ASGI it stays async so the chain is not adapted to sync; the file
+    system calls run in a worker thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.roots = [(settings.MEDIA_URL, settings.MEDIA_ROOT)]
+        if getattr(settings, 'STATIC_ROOT', None):
+            self.roots.append((settings.STATIC_URL, settings.STATIC_ROOT))
+        self.roots = [('/' + url.lstrip('/'), root) for url, root in self.roots if url and root]
+        self.max_age = settings.MEDIA_SERVING['MAX_AGE']
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        for root, name in self.candidates(request):
+            response = self.serve(request, root, name)
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        for root, name in self.candidates(request):
+            response = await sync_to_async(self.serve, thread_sensitive=False)(request, root, name)
+            if response is not None:
+                return response
+        return await self.get_response(request)
+
+    def candidates(self, request):
+        # (root, relative name) pairs the request path may be served from
+        if request.method not in ('GET', 'HEAD'):
+            return []
+        return [
+            (root, request.path_info[len(prefix):]) for prefix, root in self.roots if request.path_info.startswith(prefix)
+        ]
+
+    def find(self, root, name):
+        try:
+            path = safe_join(root, name)
+            status = os.stat(path)
+        except (SuspiciousFileOperation, ValueError, OSError):  # Traversal outside root, or missing
+            return None, None
+        if not stat.S_ISREG(status.st_mode):
+            return None, None
+        return path, status
+
+    def serve(self, request, root, name):
+        path, status = self.find(root, name)
+        if path is None:
+            return None  # Fall through to the URLconf (and its 404)
+
+        content_type, _ = mimetypes.guess_type(name)
+        content_type = content_type or 'application/octet-stream'
+        range_header = request.headers.get('Range')
+
+        encoding = None
+        if range_header is None:
+            accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+            for candidate, suffix in ENCODINGS:
+                if candidate in accepted:
+                    encoded_path, encoded_status = self.find(root, name + suffix)
+                    if encoded_path is not None:
+                        path, status, encoding = encoded_path, encoded_status, candidate
+                        break
+
+        etag = '"%x-%x%s"' % (status.st_mtime_ns, status.st_size, '-' + encoding if encoding else '')
+        last_modified = int(status.st_mtime)
+        headers = {
+            'ETag': etag,
+            'Last-Modified': http_date(last_modified),
+            'Cache-Control': IMMUTABLE if HASHED_NAME_RE.match(name) else f'public, max-age={self.max_age}',
+            'Vary': 'Accept-Encoding',
+            'Accept-Ranges': 'bytes',
+        }
+
+        if self.not_modified(request, etag, last_modified):
+            response = HttpResponseNotModified()
+            for header, value in headers.items():
+                response[header] = value
+            return response
+
+        byte_range = None
+        if range_header is not None and self.if_range_matches(request, etag, last_modified):
+            byte_range = parse_range(range_header, status.st_size)
+            if byte_range is False:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{status.st_size}'
+                return response
+
+        if byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _file_ranges(path, start, end) if request.method == 'GET' else iter(()), status=206, content_type=content_type,
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{status.st_size}'
+            response['Content-Length'] = str(end - start + 1)
+        elif request.method == 'HEAD':
+            response = HttpResponse(content_type=content_type)
+            response['Content-Length'] = str(status.st_size)
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+            response['Content-Length'] = str(status.st_size)
+
+        for header, value in headers.items():
+            response[header] = value
+        if encoding:
+            response['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    def not_modified(request, etag, last_modified):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match is not None:
+            # If-None-Match wins over If-Modified-Since when both are sent
+            return if_none_match.strip() == '*' or etag in [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        return since is not None and last_modified <= since
+
+    @staticmethod
+    def if_range_matches(request, etag, last_modified):
+        if_range = request.headers.get('If-Range')
+        if if_range is None:
+            return True
+        if if_range.startswith('"'):
+            return if_range == etag
+        return parse_http_date_safe(if_range) == last_modified
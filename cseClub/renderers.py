@@ -0,0 +1,45 @@
+import json
+import time
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .instrumentation import record_serialization
+
+try:
+    import orjson
+except ImportError:  # Optional speedup; the stdlib path produces the same bytes
+    orjson = None
+
+# DRF's encoder formats datetimes and lazy strings; orjson hands those to it
+_default = JSONEncoder().default
+
+
+def dumps(data, sort_keys=False):
+    """Compact UTF-8 JSON bytes, identical to DRF's JSONRenderer output."""
+    started = time.perf_counter()
+    if orjson is not None:
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        content = orjson.dumps(data, default=_default, option=options)
+    else:
+        content = json.dumps(
+            data, cls=JSONEncoder, sort_keys=sort_keys, ensure_ascii=False, allow_nan=False, separators=(',', ':'),
+        ).encode()
+    # Like DRF, keep the output a strict JavaScript subset
+    if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+        content = content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    record_serialization(time.perf_counter() - started)
+    return content
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer backed by orjson when it is installed; indented output still goes through the stdlib."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
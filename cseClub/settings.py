@@ -1,4 +1,5 @@
 import os
+from importlib.util import find_spec
 from pathlib import Path
 
 # Define BASE_DIR
@@ -16,7 +17,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = 'your-secret-key-here'
 DEBUG = True
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', default=[])
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -30,6 +31,7 @@ INSTALLED_APPS = [
     # 'cloudinary_storage',  # Optional if you use Cloudinary
 
     'corsheaders',
+    'rest_framework_simplejwt.token_blacklist',
 
     'club_auth',
     'club_blog',
@@ -57,16 +59,49 @@ DEBUG = env.bool('DEBUG', default=False)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Per-request query/latency measurements, Server-Timing headers and /metrics/
+INSTRUMENTATION = {
+    'QUERY_BUDGET': env.int('QUERY_BUDGET', default=20),  # requests running more queries are logged
+    # Server-Timing exposes query counts and timings to every client: opt in outside development
+    'SERVER_TIMING': env.bool('SERVER_TIMING', default=DEBUG),
+    # /metrics/ is disabled until a token is set; scrapers send it as "Authorization: Bearer <token>"
+    'METRICS_TOKEN': env('METRICS_TOKEN', default=None),
+    # Checked against REMOTE_ADDR, which behind a reverse proxy is the proxy's
+    # address for every client: there it restricts nothing and only the token does
+    'METRICS_ALLOWED_IPS': env.list('METRICS_ALLOWED_IPS', default=['127.0.0.1', '::1']),
+}
+
+# Negotiated brotli/gzip for API responses (see cseClub.compression)
+COMPRESSION = {
+    'MIN_SIZE': env.int('COMPRESSION_MIN_SIZE', default=1024),  # bytes; smaller bodies are sent as-is
+    'BROTLI_QUALITY': 5,  # used when the brotli package is installed
+}
+
+# Served by cseClub.media.MediaFilesMiddleware; hashed filenames are cached for a year instead
+MEDIA_SERVING = {
+    'MAX_AGE': env.int('MEDIA_MAX_AGE', default=3600),  # seconds
+}
+
+# Avatar thumbnails generated on upload (see club_auth.avatars)
+AVATAR_THUMBNAILS = {
+    'SIZES': (32, 64, 256),
+    'EMBED_SIZE': 64,  # used in post/comment author embeds; 2x of the 32px icons
+    'EMBED_FORMAT': 'webp',
+    'QUALITY': 80,
+    'WORKERS': env.int('AVATAR_THUMBNAIL_WORKERS', default=2),
+}
+
 AUTH_USER_MODEL = 'club_auth.CustomUser'
 
 REST_FRAMEWORK = {
-    'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
+    # The browsable API is a development aid; production only negotiates JSON
+    'DEFAULT_RENDERER_CLASSES': ('cseClub.renderers.FastJSONRenderer',) + (
+        ('rest_framework.renderers.BrowsableAPIRenderer',) if DEBUG else ()
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
+        # Bearer tokens first: no user or session lookup for API clients
+        'club_auth.authentication.StatelessJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',
@@ -81,11 +116,73 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    # Tokens carry the profile claims read by club_auth.authentication
+    'TOKEN_OBTAIN_SERIALIZER': 'club_auth.authentication.ClubTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'club_auth.authentication.ClubTokenRefreshSerializer',
+}
+
+# In-process filter in front of the logged out tokens, checked on every request (see club_auth.revocation)
+TOKEN_REVOCATION = {
+    'BLOOM_CAPACITY': env.int('TOKEN_REVOCATION_BLOOM_CAPACITY', default=100_000),
+    'BLOOM_ERROR_RATE': 0.01,
+    'CACHE_SIZE': 4096,  # database answers kept for bloom positives
+    'SYNC_INTERVAL': env.float('TOKEN_REVOCATION_SYNC_INTERVAL', default=5.0),  # seconds
+    'REBUILD_INTERVAL': 3600,  # seconds; drops compacted tokens from the filter
+}
+
+# Full CustomUser rows kept per process for token-authenticated requests that need them
+AUTH_USER_CACHE = {
+    'TTL': env.int('AUTH_USER_CACHE_TTL', default=60),  # seconds
+    'MAX_ENTRIES': env.int('AUTH_USER_CACHE_MAX_ENTRIES', default=1024),
+}
+
+# Blog feed pagination
+BLOG_FEED_PAGE_SIZE = env.int('BLOG_FEED_PAGE_SIZE', default=20)
+BLOG_FEED_MAX_PAGE_SIZE = env.int('BLOG_FEED_MAX_PAGE_SIZE', default=100)
+
+# Comment pagination: top-level comments per page (details and "more comments",
+# capped by BLOG_FEED_MAX_PAGE_SIZE) and the replies previewed under each
+BLOG_COMMENT_PAGE_SIZE = env.int('BLOG_COMMENT_PAGE_SIZE', default=20)
+BLOG_REPLY_PREVIEW_SIZE = env.int('BLOG_REPLY_PREVIEW_SIZE', default=3)
+
+# Response cache for public blog reads. Local memory is per process, so with
+# several workers use the file backend or keep the timeouts short: they bound
+# how long another worker may serve a payload invalidated elsewhere.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'blog': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache'
+        if env('BLOG_CACHE_BACKEND', default='locmem') == 'file'
+        else 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': env('BLOG_CACHE_LOCATION', default=os.path.join(BASE_DIR, '.cache', 'blog')),
+        'OPTIONS': {'MAX_ENTRIES': env.int('BLOG_CACHE_MAX_ENTRIES', default=1000)},
+    },
+}
+
+BLOG_CACHE = {
+    'ALIAS': 'blog',
+    'TIMEOUT': env.int('BLOG_CACHE_TIMEOUT', default=300),  # post details; invalidated on every write
+    'FEED_TIMEOUT': env.int('BLOG_CACHE_FEED_TIMEOUT', default=30),  # max staleness of feed counts
+}
+
+# Write-behind buffering for likes (see club_blog.like_buffer)
+BLOG_LIKE_BUFFER = {
+    'ENABLED': env.bool('BLOG_LIKE_BUFFER', default=False),
+    'FLUSH_INTERVAL': env.float('BLOG_LIKE_BUFFER_FLUSH_INTERVAL', default=1.0),  # seconds
+    'MAX_PENDING': env.int('BLOG_LIKE_BUFFER_MAX_PENDING', default=5000),  # flush early past this
+    'JOURNAL_DIR': env('BLOG_LIKE_BUFFER_JOURNAL_DIR', default=None),  # on-disk journal, off when unset
 }
 
 MIDDLEWARE = [
+    # First, so its total covers every other middleware (see cseClub.instrumentation)
+    'cseClub.instrumentation.InstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'cseClub.compression.CompressionMiddleware',
+    # Answers /media/ (and collected /static/) requests before sessions and routing
+    'cseClub.media.MediaFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -122,13 +219,81 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'cseClub.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Database: SQLite by default, Postgres with DB_ENGINE=postgres
+DB_ENGINE = env('DB_ENGINE', default='sqlite')
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': env('DB_NAME', default='cseclub'),
+            'USER': env('DB_USER', default='cseclub'),
+            'PASSWORD': env('DB_PASSWORD', default=''),
+            'HOST': env('DB_HOST', default='localhost'),
+            'PORT': env('DB_PORT', default='5432'),
+            # psycopg_pool connection pool, kept inside each Django process (so up to
+            # max_size connections per worker process); Django requires CONN_MAX_AGE = 0 with it
+            'CONN_MAX_AGE': 0,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': env.int('DB_POOL_MIN_SIZE', default=2),
+                    'max_size': env.int('DB_POOL_MAX_SIZE', default=10),
+                    'timeout': env.int('DB_POOL_TIMEOUT', default=10),
+                },
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': env('DB_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+            'CONN_MAX_AGE': env.int('DB_CONN_MAX_AGE', default=600),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
     }
+    if env.bool('SQLITE_TUNED', default=True):
+        DATABASES['default']['OPTIONS'] = {
+            # Seconds a writer waits for the lock before "database is locked"
+            'timeout': env.int('SQLITE_BUSY_TIMEOUT', default=20),
+            # Take the write lock at BEGIN so read-then-write transactions never deadlock on upgrade
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                f"PRAGMA mmap_size={env.int('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024)};"
+                'PRAGMA cache_size=-20000;'
+                'PRAGMA temp_store=MEMORY;'
+            ),
+        }
+
+# Password hashing costs and login concurrency (see club_auth.hashers, bench_hashers)
+PASSWORD_HASHING = {
+    'ALGORITHM': env('PASSWORD_HASHER', default='scrypt'),  # 'scrypt', or 'argon2' when argon2-cffi is installed
+    'SCRYPT_N': env.int('PASSWORD_SCRYPT_N', default=2**14),  # 128 * N * r bytes of memory per hash
+    'SCRYPT_R': env.int('PASSWORD_SCRYPT_R', default=8),
+    'SCRYPT_P': env.int('PASSWORD_SCRYPT_P', default=1),
+    'ARGON2_TIME_COST': env.int('PASSWORD_ARGON2_TIME_COST', default=2),
+    'ARGON2_MEMORY_COST': env.int('PASSWORD_ARGON2_MEMORY_COST', default=19456),  # KiB
+    'ARGON2_PARALLELISM': env.int('PASSWORD_ARGON2_PARALLELISM', default=1),
+    # Concurrent hashing requests per process; the rest wait up to QUEUE_TIMEOUT seconds
+    'MAX_CONCURRENCY': env.int('PASSWORD_HASHING_MAX_CONCURRENCY', default=max(1, (os.cpu_count() or 2) // 2)),
+    'QUEUE_TIMEOUT': env.float('PASSWORD_HASHING_QUEUE_TIMEOUT', default=2.0),
 }
 
+# Django verifies with whichever hasher matches a stored hash and rehashes with
+# the first one on the next successful login, so PBKDF2 hashes upgrade transparently
+PASSWORD_HASHERS = [
+    'club_auth.hashers.TunedScryptPasswordHasher',
+    'club_auth.hashers.TunedArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+if PASSWORD_HASHING['ALGORITHM'] == 'argon2' and find_spec('argon2'):
+    PASSWORD_HASHERS[:2] = reversed(PASSWORD_HASHERS[:2])
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -0,0 +1,165 @@
+import gzip
+import logging
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils.http import http_date
+
+from club_blog.factories import seed_blog
+
+from .instrumentation import OPTIONS as INSTRUMENTATION_OPTIONS
+from .media import parse_range
+
+
+class AsyncMiddlewareTests(SimpleTestCase):
+    @override_settings(DEBUG=True)  # Adaptations are only logged in debug mode
+    def test_asgi_chain_is_not_adapted(self):
+        # A sync-only middleware anywhere in MIDDLEWARE pushes the whole chain through SyncToAsync
+        with self.assertLogs('django.request', 'DEBUG') as logs:
+            handler = ASGIHandler()
+            logging.getLogger('django.request').debug("Middleware loaded")
+        self.assertEqual([line for line in logs.output if 'adapted' in line], [])
+        self.assertTrue(iscoroutinefunction(handler._middleware_chain))
+
+
+class AsyncCompressionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_blog(users=5, posts=20, comments_per_post=0, likes_per_post=0)
+
+    async def test_async_response_is_compressed(self):
+        response = await self.async_client.get('/blog/async/posts/', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'"results"', gzip.decompress(response.content))
+
+
+class MediaFilesTests(SimpleTestCase):
+    CONTENT = b'0123456789' * 10
+
+    def setUp(self):
+        base = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, base)
+        media_root = os.path.join(base, 'media')
+        os.makedirs(media_root)
+        with open(os.path.join(media_root, 'notes.txt'), 'wb') as notes:
+            notes.write(self.CONTENT)
+        with open(os.path.join(media_root, 'notes.txt.gz'), 'wb') as notes:
+            notes.write(gzip.compress(self.CONTENT))
+        with open(os.path.join(base, 'secret.txt'), 'wb') as secret:
+            secret.write(b'secret')
+        media_settings = override_settings(MEDIA_ROOT=media_root, STATIC_ROOT=None)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def get(self, **headers):
+        return self.client.get('/media/notes.txt', headers=headers)
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=10-19', 100), (10, 19))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-5', 100), (95, 99))
+        self.assertEqual(parse_range('bytes=50-500', 100), (50, 99))
+        self.assertIs(parse_range('bytes=100-', 100), False)
+        self.assertIs(parse_range('bytes=-0', 100), False)
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 100))
+        self.assertIsNone(parse_range('items=0-1', 100))
+
+    def test_whole_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_range(self):
+        response = self.get(Range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT[10:20])
+
+    def test_unsatisfiable_range(self):
+        response = self.get(Range='bytes=200-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_multiple_or_invalid_ranges_send_whole_file(self):
+        for header in ('bytes=0-1,5-6', 'bytes=abc'):
+            with self.subTest(header):
+                response = self.get(Range=header)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+
+    def test_if_range(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(Range='bytes=0-9', **{'If-Range': etag}).status_code, 206)
+        # A stale validator: the file changed, so the whole new one is sent
+        self.assertEqual(self.get(Range='bytes=0-9', **{'If-Range': '"stale"'}).status_code, 200)
+        self.assertEqual(self.get(Range='bytes=0-9', **{'If-Range': http_date(0)}).status_code, 200)
+
+    def test_not_modified(self):
+        response = self.get()
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertEqual(self.get(**{'If-None-Match': etag}).status_code, 304)
+        self.assertEqual(self.get(**{'If-None-Match': f'W/{etag}'}).status_code, 304)
+        self.assertEqual(self.get(**{'If-Modified-Since': last_modified}).status_code, 304)
+        # If-None-Match wins over If-Modified-Since
+        self.assertEqual(self.get(**{'If-None-Match': '"other"', 'If-Modified-Since': last_modified}).status_code, 200)
+
+    def test_precompressed_sibling(self):
+        response = self.get(**{'Accept-Encoding': 'br;q=0, gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.CONTENT)
+        self.assertNotEqual(response['ETag'], self.get()['ETag'])
+        # Ranges address the file itself, never the compressed sibling
+        self.assertNotIn('Content-Encoding', self.get(**{'Accept-Encoding': 'gzip', 'Range': 'bytes=0-9'}))
+
+    def test_cache_control(self):
+        thumbnail = 'avatars/thumbs/ab/' + 'ab' * 16 + '-64.webp'
+        for name in (thumbnail, 'IMG_20231015123456.jpg', 'report-0123456789abcdef.pdf'):
+            path = os.path.join(settings.MEDIA_ROOT, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as upload:
+                upload.write(b'data')
+        self.assertEqual(self.client.get('/media/' + thumbnail)['Cache-Control'], 'public, max-age=31536000, immutable')
+        for name in ('IMG_20231015123456.jpg', 'report-0123456789abcdef.pdf', 'notes.txt'):
+            with self.subTest(name):
+                self.assertEqual(self.client.get('/media/' + name)['Cache-Control'], f"public, max-age={settings.MEDIA_SERVING['MAX_AGE']}")
+
+    def test_traversal_falls_through(self):
+        self.assertEqual(self.client.get('/media/../secret.txt').status_code, 404)
+        self.assertEqual(self.client.get('/media/missing.txt').status_code, 404)
+
+
+class ServerTimingTests(TestCase):
+    def test_server_timing_is_opt_in(self):
+        with mock.patch.dict(INSTRUMENTATION_OPTIONS, SERVER_TIMING=False):
+            self.assertNotIn('Server-Timing', self.client.get('/blog/posts/'))
+        with mock.patch.dict(INSTRUMENTATION_OPTIONS, SERVER_TIMING=True):
+            self.assertIn('queries', self.client.get('/blog/posts/')['Server-Timing'])
+
+
+class MetricsTests(SimpleTestCase):
+    def scrape(self, token=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        return self.client.get('/metrics/', headers=headers)
+
+    def test_disabled_without_token(self):
+        with mock.patch.dict(INSTRUMENTATION_OPTIONS, METRICS_TOKEN=None):
+            self.assertEqual(self.scrape().status_code, 404)
+            self.assertEqual(self.scrape('anything').status_code, 404)
+
+    def test_requires_token(self):
+        with mock.patch.dict(INSTRUMENTATION_OPTIONS, METRICS_TOKEN='scrape-secret'):
+            self.assertEqual(self.scrape().status_code, 404)
+            self.assertEqual(self.scrape('wrong').status_code, 404)
+            response = self.scrape('scrape-secret')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b'token_logout_lookups', response.content)
+            # The token alone is not enough from outside METRICS_ALLOWED_IPS
+            response = self.client.get('/metrics/', REMOTE_ADDR='203.0.113.5', headers={'Authorization': 'Bearer scrape-secret'})
+            self.assertEqual(response.status_code, 404)
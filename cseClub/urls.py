@@ -17,11 +17,14 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path,include
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from club_auth.hashers import hashing_slot
+from cseClub.instrumentation import metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/token/', hashing_slot(TokenObtainPairView.as_view()), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('auth/',include('club_auth.urls')),
     path('blog/',include('club_blog.urls')),
+    path('metrics/', metrics, name='metrics'),
 ]